@@ -0,0 +1 @@
+"""Benchmarks for the Raxa TellstickNet integration."""
@@ -0,0 +1,105 @@
+"""Fixtures for the Raxa TellstickNet benchmarks."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from custom_components.raxa_tellsticknet.tellsticknet import TellstickNet
+
+from .simulator import (
+    SimulatedTellstick,
+    async_start_with_hub,
+    simulated_tellsticks,
+)
+
+# Packets recorded from a TellstickNet running the custom firmware.
+RECORDED_PACKETS = {
+    "discovery": b"TellStickNet:ACCA54012345:ABCDEFGHIJ:17",
+    "selflearning": b"TSNETRCclass:command;protocol:arctech;model:selflearning;data:0x2F4A6B91;\r\n",
+    "sensor": b"TSNETRCclass:sensor;protocol:fineoffset;data:0x48801AEA06;\r\n",
+    "empty": b"TSNETRCclass:command;protocol:arctech;model:selflearning;data:;\r\n",
+}
+
+
+class BusRecorder:
+    """Collects events fired by the hub."""
+
+    def __init__(self) -> None:
+        """Initialize an empty recording."""
+        self.events: list[tuple[str, dict[str, Any]]] = []
+
+    def async_fire(self, event_type: str, event_data: dict[str, Any]) -> None:
+        """Record a fired event."""
+        self.events.append((event_type, event_data))
+
+
+class BenchmarkHass:
+    """The parts of Home Assistant the TellstickNet hub uses."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the stand-in running on loop."""
+        self.loop = loop
+        self.bus = BusRecorder()
+        # The network integration's singleton, without adapters discovery
+        # falls back to the limited broadcast like on a single homed host.
+        self.data: dict[str, Any] = {"network": SimpleNamespace(adapters=[])}
+
+
+@pytest.fixture
+def recorded_packets() -> dict[str, bytes]:
+    """Return recorded packets by kind."""
+    return RECORDED_PACKETS
+
+
+@pytest.fixture
+def loop():
+    """Return a fresh event loop for a benchmark."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def hass(loop) -> BenchmarkHass:
+    """Return a minimal hass for driving the hub outside Home Assistant."""
+    return BenchmarkHass(loop)
+
+
+@pytest.fixture(autouse=True)
+def allow_sockets(request):
+    """Let the benchmarks bind loopback sockets.
+
+    pytest-homeassistant-custom-component, which the tests use, blocks
+    sockets in every test through pytest-socket.
+    """
+    if request.config.pluginmanager.hasplugin("socket"):
+        request.getfixturevalue("socket_enabled")
+
+
+@pytest.fixture
+def simulated_hub(
+    hass, loop, request
+) -> tuple[TellstickNet, list[SimulatedTellstick]]:
+    """Return a started hub and the simulated tellsticks it found.
+
+    One tellstick is simulated unless the test parametrizes the fixture
+    indirectly with a count. Skips when the loopback addresses can not be
+    bound.
+    """
+    tellsticks = simulated_tellsticks(getattr(request, "param", 1))
+    tellstick = TellstickNet(hass)
+    try:
+        try:
+            loop.run_until_complete(
+                asyncio.wait_for(async_start_with_hub(tellstick, tellsticks), 5)
+            )
+        except OSError as err:
+            pytest.skip(f"Can not bind simulated tellstick: {err}")
+        yield tellstick, tellsticks
+    finally:
+        loop.run_until_complete(tellstick.async_stop())
+        for simulated in tellsticks:
+            simulated.stop()
@@ -0,0 +1,288 @@
+"""Simulated TellstickNet units for load and latency testing.
+
+Each simulated unit binds the discovery and command ports on its own
+loopback address, answers discovery requests, decodes send envelopes back
+into commands and can emit TSNETRC traffic towards the integration.
+
+Run standalone with::
+
+    python -m benchmarks.simulator --count 3 --loss 0.05 --delay 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass
+import ipaddress
+import logging
+import random
+import socket
+import time
+from typing import Any
+
+from custom_components.raxa_tellsticknet.const import (
+    BROADCAST_PORT,
+    COMMUNICATION_PORT,
+)
+from custom_components.raxa_tellsticknet.protocol import (
+    decode_self_learning_pulse,
+    parse_envelopes,
+)
+from custom_components.raxa_tellsticknet.tellsticknet import TellstickNet
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ReceivedCommand:
+    """A command decoded from a send envelope."""
+
+    device_code: int
+    group_mode: bool
+    group_code: int
+    action: int
+    dim_level: int | None
+    repeats: int
+    pause: int
+    received_at: float
+
+
+class _Endpoint(asyncio.DatagramProtocol):
+    def __init__(self, tellstick: SimulatedTellstick, discovery: bool) -> None:
+        """Initialize the endpoint of the discovery or the command port."""
+        self._tellstick = tellstick
+        self._discovery = discovery
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        if self._discovery:
+            self._tellstick.handle_discovery(data, addr)
+        else:
+            self._tellstick.handle_command(data, addr)
+
+
+class SimulatedTellstick:
+    """A TellstickNet unit answering on a local address."""
+
+    def __init__(
+        self,
+        host: str,
+        mac: str,
+        *,
+        activation_code: str = "SIMULATED",
+        version: str = "17",
+        hub_host: str = "127.0.0.1",
+        loss: float = 0.0,
+        delay: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize a unit, loss and delay apply to the packets it gets."""
+        self.host = host
+        self.mac = mac
+        self.activation_code = activation_code
+        self.version = version
+        self.hub_host = hub_host
+        self.loss = loss
+        self.delay = delay
+        self.received: list[ReceivedCommand] = []
+        self.datagrams = 0
+        self.dropped = 0
+        self.malformed = 0
+        self._random = random.Random(seed)
+        self._discovery: asyncio.DatagramTransport | None = None
+        self._commands: asyncio.DatagramTransport | None = None
+
+    @property
+    def announcement(self) -> bytes:
+        """Return the discovery reply of this unit."""
+        return f"TellStickNet:{self.mac}:{self.activation_code}:{self.version}".encode()
+
+    async def async_start(self, announce: bool = True) -> None:
+        """Bind the ports, announce the unit to the hub unless disabled.
+
+        Broadcasts do not reach loopback addresses, so the unit sends its
+        discovery reply unsolicited to make the hub pick it up.
+        """
+        loop = asyncio.get_running_loop()
+        self._discovery, _ = await loop.create_datagram_endpoint(
+            lambda: _Endpoint(self, True), sock=_bind(self.host, BROADCAST_PORT)
+        )
+        self._commands, _ = await loop.create_datagram_endpoint(
+            lambda: _Endpoint(self, False), sock=_bind(self.host, COMMUNICATION_PORT)
+        )
+        if announce:
+            self._commands.sendto(self.announcement, (self.hub_host, COMMUNICATION_PORT))
+
+    def stop(self) -> None:
+        """Close the ports."""
+        for transport in (self._discovery, self._commands):
+            if transport is not None:
+                transport.close()
+        self._discovery = self._commands = None
+
+    def handle_discovery(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        """Answer a discovery request like a real unit."""
+        if data == b"D":
+            self._reply(self.announcement, addr)
+
+    def handle_command(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        """Decode the send envelopes of a datagram unless the link loses it."""
+        if self.loss and self._random.random() < self.loss:
+            self.dropped += 1
+            return
+        if data == b"D":
+            self._reply(self.announcement, addr)
+            return
+        try:
+            commands = [
+                (decode_self_learning_pulse(pulse), repeats, pause)
+                for pulse, repeats, pause in parse_envelopes(data)
+            ]
+        except ValueError:
+            self.malformed += 1
+            _LOGGER.warning("%s received malformed packet %r", self.host, data)
+            return
+        self.datagrams += 1
+        received_at = time.perf_counter()
+        for decoded, repeats, pause in commands:
+            command = ReceivedCommand(*decoded, repeats, pause, received_at)
+            self.received.append(command)
+            _LOGGER.debug("%s received %s", self.host, command)
+
+    def emit(self, payload: str) -> None:
+        """Send a TSNETRC packet to the hub."""
+        self._reply(f"TSNETRC{payload}\r\n".encode(), (self.hub_host, COMMUNICATION_PORT))
+
+    def emit_selflearning(
+        self, device_code: int, group_code: int, on: bool, group_mode: bool = False
+    ) -> None:
+        """Send a received selflearning remote frame to the hub."""
+        data = device_code << 6 | group_mode << 5 | on << 4 | group_code
+        self.emit(
+            f"class:command;protocol:arctech;model:selflearning;data:0x{data:08X};"
+        )
+
+    async def async_emit_traffic(
+        self, rate: float, payloads: list[str], duration: float | None = None
+    ) -> None:
+        """Emit the payloads round robin at rate packets per second."""
+        loop = asyncio.get_running_loop()
+        end = None if duration is None else loop.time() + duration
+        index = 0
+        while end is None or loop.time() < end:
+            self.emit(payloads[index % len(payloads)])
+            index += 1
+            await asyncio.sleep(1 / rate)
+
+    def _reply(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        if self._commands is None:
+            return
+        if self.delay:
+            asyncio.get_running_loop().call_later(
+                self.delay, self._commands.sendto, data, addr
+            )
+        else:
+            self._commands.sendto(data, addr)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setblocking(False)
+    try:
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def simulated_tellsticks(
+    count: int, base_host: str = "127.0.0.2", **kwargs: Any
+) -> list[SimulatedTellstick]:
+    """Return count units on consecutive loopback addresses."""
+    base = ipaddress.ip_address(base_host)
+    return [
+        SimulatedTellstick(str(base + index), f"ACCA5400{index:04X}", **kwargs)
+        for index in range(count)
+    ]
+
+
+async def async_start_with_hub(
+    hub: TellstickNet, tellsticks: list[SimulatedTellstick]
+) -> None:
+    """Start a hub and units, returning once the hub found every unit.
+
+    Raises OSError when the hub or a unit can not bind its ports.
+    """
+    await hub.async_start()
+    for tellstick in tellsticks:
+        await tellstick.async_start()
+    while len(hub.lanes) < len(tellsticks):
+        await asyncio.sleep(0.001)
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    tellsticks = simulated_tellsticks(
+        args.count,
+        args.base_host,
+        hub_host=args.hub_host,
+        loss=args.loss,
+        delay=args.delay,
+    )
+    for tellstick in tellsticks:
+        await tellstick.async_start()
+        _LOGGER.info("Simulating %s on %s", tellstick.mac, tellstick.host)
+    traffic = [
+        asyncio.create_task(tellstick.async_emit_traffic(args.rc_rate, args.payload))
+        for tellstick in tellsticks
+        if args.rc_rate
+    ]
+    try:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            for tellstick in tellsticks:
+                _LOGGER.info(
+                    "%s received %d commands, dropped %d, malformed %d",
+                    tellstick.host,
+                    len(tellstick.received),
+                    tellstick.dropped,
+                    tellstick.malformed,
+                )
+    finally:
+        for task in traffic:
+            task.cancel()
+        for tellstick in tellsticks:
+            tellstick.stop()
+
+
+def main() -> None:
+    """Run simulated tellsticks until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1, help="Number of units")
+    parser.add_argument("--base-host", default="127.0.0.2", help="First unit address")
+    parser.add_argument("--hub-host", default="127.0.0.1", help="Integration address")
+    parser.add_argument("--loss", type=float, default=0.0, help="Command loss ratio")
+    parser.add_argument("--delay", type=float, default=0.0, help="Reply delay in s")
+    parser.add_argument(
+        "--rc-rate", type=float, default=0.0, help="TSNETRC packets per second"
+    )
+    parser.add_argument(
+        "--payload",
+        action="append",
+        default=None,
+        help="TSNETRC payload to emit, may be repeated",
+    )
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    args = parser.parse_args()
+    if args.payload is None:
+        args.payload = [
+            "class:command;protocol:arctech;model:selflearning;data:0x2F4A6B91;"
+        ]
+    logging.basicConfig(level=logging.INFO)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_async_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Golden checks and benchmarks for decoding TSNETRC payloads."""
+import pytest
+
+from custom_components.raxa_tellsticknet.decoder import decode_rf_message
+
+GOLDEN_MESSAGES = [
+    (
+        "class:command;protocol:arctech;model:selflearning;data:0x2F4A6BA0;",
+        {
+            "class": "command",
+            "protocol": "arctech",
+            "model": "selflearning",
+            "device_code": 12396974,
+            "group_mode": True,
+            "method": "turnoff",
+            "group_code": 0,
+        },
+    ),
+    (
+        "class:command;protocol:arctech;model:codeswitch;data:0xE12;",
+        {
+            "class": "command",
+            "protocol": "arctech",
+            "model": "codeswitch",
+            "house": "C",
+            "unit": 2,
+            "method": "turnon",
+        },
+    ),
+    (
+        "class:sensor;protocol:fineoffset;data:0x48801A3206;",
+        {
+            "class": "sensor",
+            "protocol": "fineoffset",
+            "id": 0x88,
+            "temperature": 2.6,
+            "humidity": 50,
+        },
+    ),
+    (
+        "class:sensor;protocol:fineoffset;data:0x48881AFF06;",
+        {
+            "class": "sensor",
+            "protocol": "fineoffset",
+            "id": 0x88,
+            "temperature": -2.6,
+        },
+    ),
+    (
+        "class:sensor;protocol:mandolyn;data:0x102848CC;",
+        {
+            "class": "sensor",
+            "protocol": "mandolyn",
+            "id": 11,
+            "temperature": 22.8,
+            "humidity": 40,
+        },
+    ),
+    (
+        "class:command;protocol:sartano;model:codeswitch;data:0x4A5;",
+        {"class": "command", "protocol": "sartano", "model": "codeswitch"},
+    ),
+]
+
+
+@pytest.mark.parametrize(("payload", "expected"), GOLDEN_MESSAGES)
+def test_decode_golden(payload, expected):
+    """Known protocols are decoded into typed fields."""
+    assert decode_rf_message(payload) == expected
+
+
+@pytest.mark.parametrize(
+    "payload", [payload for payload, _ in GOLDEN_MESSAGES[::2]], ids=["selflearning", "fineoffset", "mandolyn"]
+)
+def test_decode(benchmark, payload):
+    """Decoding throughput per protocol."""
+    benchmark(decode_rf_message, payload)
@@ -0,0 +1,44 @@
+"""Startup discovery of simulated tellsticks at configured addresses."""
+import asyncio
+
+import pytest
+
+from custom_components.raxa_tellsticknet.tellsticknet import TellstickNet
+
+from .simulator import simulated_tellsticks
+
+
+def test_static_discovery(benchmark, hass, loop):
+    """Time from starting the hub until every configured tellstick is identified.
+
+    The simulated units do not announce themselves, they are only found by
+    the discovery requests sent to their addresses.
+    """
+    tellsticks = simulated_tellsticks(3, base_host="127.0.0.20")
+    tellstick = TellstickNet(hass)
+    for simulated in tellsticks:
+        tellstick.async_add_static_host(simulated.host)
+
+    async def setup():
+        for simulated in tellsticks:
+            try:
+                await simulated.async_start(announce=False)
+            except OSError as err:
+                pytest.skip(f"Can not bind simulated tellstick: {err}")
+
+    async def start_and_identify():
+        await tellstick.async_start()
+        # Configured tellsticks are usable before they answer.
+        assert len(tellstick.lanes) == len(tellsticks)
+        while any(info.mac is None for info in tellstick.tellsticks.values()):
+            await asyncio.sleep(0.0005)
+        await tellstick.async_stop()
+        tellstick.tellsticks.clear()
+
+    loop.run_until_complete(setup())
+    try:
+        benchmark(lambda: loop.run_until_complete(asyncio.wait_for(start_and_identify(), 5)))
+    finally:
+        for simulated in tellsticks:
+            simulated.stop()
+    assert tellstick.stats.discovery_requests >= 1
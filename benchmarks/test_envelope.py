@@ -0,0 +1,42 @@
+"""Golden checks and benchmarks for TellstickNet envelope framing."""
+import pytest
+
+from custom_components.raxa_tellsticknet.protocol import (
+    ON,
+    parse_envelope,
+    parse_envelopes,
+    pulse_airtime,
+    self_learning_pulse,
+    send_envelope,
+)
+
+PULSE = self_learning_pulse(12345678, False, 3, ON)
+
+
+def test_envelope_golden():
+    """The envelope wraps the pulse with hex length, pause and repeats."""
+    assert send_envelope(b"\x1a\xfe\x1a\xff", 8, 15) == b"4:sendh1:S4:\x1a\xfe\x1a\xff1:PiFs1:Ri8ss"
+    assert send_envelope(PULSE, 10, 255) == (
+        b"4:sendh1:S84:" + PULSE + b"1:PiFFs1:RiAss"
+    )
+
+
+def test_parse_envelopes():
+    """Several envelopes in one datagram are split in order."""
+    other = self_learning_pulse(42, True, 0, ON)
+    datagram = send_envelope(PULSE, 8, 15) + send_envelope(other, 3, 20)
+    assert parse_envelopes(datagram) == [(PULSE, 8, 15), (other, 3, 20)]
+    with pytest.raises(ValueError):
+        parse_envelope(datagram)
+    with pytest.raises(ValueError):
+        parse_envelopes(datagram[:-1])
+
+
+def test_airtime():
+    """Air time covers every repeat of the pulse and its pause."""
+    assert pulse_airtime(bytes([100, 100]), 2, 10) == 2 * (0.002 + 0.010)
+
+
+def test_send_envelope(benchmark):
+    """Envelope construction for a full selflearning pulse."""
+    benchmark(send_envelope, PULSE, 8, 15)
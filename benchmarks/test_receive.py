@@ -0,0 +1,72 @@
+"""Golden checks and benchmarks for parsing received packets."""
+import pytest
+
+from custom_components.raxa_tellsticknet.protocol import parse_message
+from custom_components.raxa_tellsticknet.tellsticknet import DuplicateFilter
+
+
+def test_parse_discovery(recorded_packets):
+    """A discovery reply is parsed into the tellstick's identity."""
+    assert parse_message(recorded_packets["discovery"]) == {
+        "mac": "ACCA54012345",
+        "activation_code": "ABCDEFGHIJ",
+        "version": "17",
+        "type": "tellstick_detected",
+    }
+
+
+def test_parse_message_received(recorded_packets):
+    """A TSNETRC packet is decoded and passed on without framing."""
+    assert parse_message(recorded_packets["selflearning"]) == {
+        "class": "command",
+        "protocol": "arctech",
+        "model": "selflearning",
+        "device_code": 0x2F4A6B91 >> 6,
+        "group_mode": False,
+        "method": "turnon",
+        "group_code": 1,
+        "data": "class:command;protocol:arctech;model:selflearning;data:0x2F4A6B91;",
+        "type": "message_received",
+    }
+
+
+def test_parse_empty(recorded_packets):
+    """TSNETRC packets without data are dropped."""
+    assert parse_message(recorded_packets["empty"]) is None
+
+
+@pytest.mark.parametrize(
+    "data", [b"TSNETRCclass:command;data:0x\xff;\r\n", b"\x00\x01", b"TellStickNet:x"]
+)
+def test_parse_garbage(data):
+    """Packets that are not valid ASCII or have an unknown form are dropped."""
+    assert parse_message(data) is None
+
+
+def test_parse_returns_copies(recorded_packets):
+    """Repeated packets are parsed from a cache without sharing the event data."""
+    first = parse_message(recorded_packets["selflearning"])
+    first["method"] = "changed"
+    assert parse_message(recorded_packets["selflearning"])["method"] == "turnon"
+
+
+@pytest.mark.parametrize("kind", ["discovery", "selflearning", "sensor", "empty"])
+def test_parse(benchmark, recorded_packets, kind):
+    """Receive path parsing per packet kind."""
+    benchmark(parse_message, recorded_packets[kind])
+
+
+def test_parse_uncached(benchmark):
+    """Receive path parsing of sensor readings never seen before."""
+    packets = [
+        f"TSNETRCclass:sensor;protocol:fineoffset;data:0x{data:010X};\r\n".encode()
+        for data in range(0x4890A8400B, 0x4890A8400B + 4096)
+    ]
+    packets = iter(packets * 100)
+    benchmark(lambda: parse_message(next(packets)))
+
+
+def test_duplicate_filter_hit(benchmark, recorded_packets):
+    """Cost of suppressing a repeated packet."""
+    duplicates = DuplicateFilter(window=float("inf"))
+    benchmark(duplicates.is_duplicate, recorded_packets["selflearning"], 0.0)
@@ -0,0 +1,52 @@
+"""End to end send latency against a local stand-in tellstick."""
+import asyncio
+import socket
+
+import pytest
+
+from custom_components.raxa_tellsticknet.const import COMMUNICATION_PORT
+from custom_components.raxa_tellsticknet.protocol import ON
+from custom_components.raxa_tellsticknet.tellsticknet import Command, TellstickNet
+
+STAND_IN_HOST = "127.0.0.2"
+
+
+@pytest.fixture
+def stand_in():
+    """Bind a socket where the hub will send commands for a tellstick."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((STAND_IN_HOST, COMMUNICATION_PORT))
+    except OSError as err:
+        sock.close()
+        pytest.skip(f"Can not bind stand-in tellstick: {err}")
+    sock.setblocking(False)
+    yield sock
+    sock.close()
+
+
+def test_send_latency(benchmark, hass, loop, stand_in):
+    """Time from queueing a command until the tellstick receives it."""
+    tellstick = TellstickNet(hass)
+    loop.run_until_complete(tellstick.async_start())
+    stand_in.sendto(b"TellStickNet:ACCA54012345:ABCDEFGHIJ:17", ("127.0.0.1", COMMUNICATION_PORT))
+
+    async def wait_for_tellstick():
+        while not tellstick.lanes:
+            await asyncio.sleep(0.001)
+
+    loop.run_until_complete(asyncio.wait_for(wait_for_tellstick(), 5))
+    lane = tellstick.lanes[STAND_IN_HOST]
+
+    async def send_and_receive():
+        # Air time pacing is covered elsewhere, measure the send path only.
+        lane.busy_until = 0
+        tellstick.async_queue_command(Command(12345678, 3, ON))
+        return await loop.sock_recv(stand_in, 1024)
+
+    try:
+        data = benchmark(lambda: loop.run_until_complete(send_and_receive()))
+    finally:
+        loop.run_until_complete(tellstick.async_stop())
+    assert data.startswith(b"4:sendh1:S84:")
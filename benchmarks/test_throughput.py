@@ -0,0 +1,73 @@
+"""Command throughput through the hub to simulated tellsticks."""
+import asyncio
+
+import pytest
+
+from custom_components.raxa_tellsticknet.protocol import DIM, OFF, ON
+from custom_components.raxa_tellsticknet.tellsticknet import Command, TransmitLane
+
+COMMANDS = 1000
+# Commands queued before waiting for delivery, keeps loopback buffers from
+# overflowing.
+BURST = 100
+
+
+@pytest.fixture
+def no_airtime(monkeypatch):
+    """Measure the integration rather than the pacing of the RF band."""
+    enqueue = TransmitLane.async_enqueue
+    monkeypatch.setattr(
+        TransmitLane,
+        "async_enqueue",
+        lambda lane, buffer, airtime, command=None: enqueue(lane, buffer, 0, command),
+    )
+
+
+@pytest.mark.parametrize("simulated_hub", [1, 3], indirect=True)
+def test_command_throughput(benchmark, loop, no_airtime, simulated_hub):
+    """Time to deliver a burst of commands to every simulated tellstick."""
+    tellstick, tellsticks = simulated_hub
+
+    async def burst():
+        for simulated in tellsticks:
+            simulated.received.clear()
+        for index in range(COMMANDS):
+            action = (ON, OFF, DIM)[index % 3]
+            tellstick.async_queue_command(
+                Command(index, index & 0xF, action, 7 if action == DIM else None)
+            )
+            if (index + 1) % BURST == 0:
+                while any(len(sim.received) <= index for sim in tellsticks):
+                    await asyncio.sleep(0.0005)
+
+    benchmark.pedantic(
+        lambda: loop.run_until_complete(asyncio.wait_for(burst(), 30)),
+        rounds=5,
+    )
+    assert tellsticks[0].received[1].action == OFF
+    assert not any(simulated.malformed for simulated in tellsticks)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_group_burst(benchmark, loop, no_airtime, simulated_hub, batched):
+    """Time to switch a group of 20 lights, one command each or as one burst."""
+    tellstick, (simulated,) = simulated_hub
+    commands = [Command(1000 + index, 0, ON) for index in range(20)]
+
+    async def switch():
+        simulated.received.clear()
+        if batched:
+            tellstick.async_queue_commands(commands)
+        else:
+            for command in commands:
+                tellstick.async_queue_command(command)
+        while len(simulated.received) < len(commands):
+            await asyncio.sleep(0.0005)
+
+    benchmark.pedantic(
+        lambda: loop.run_until_complete(asyncio.wait_for(switch(), 5)),
+        rounds=20,
+    )
+    assert [command.device_code for command in simulated.received] == [
+        command.device_code for command in commands
+    ]
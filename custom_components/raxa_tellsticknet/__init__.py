@@ -1,15 +1,34 @@
 """Raxa TellstickNet integration."""
+from datetime import datetime
 import ipaddress
 import logging
 
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_HOST, Platform
 from homeassistant.helpers import config_validation as cv
-
-from .const import DOMAIN
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    CONF_TELLSTICKS,
+    DATA_TELLSTICK,
+    DOMAIN,
+    EVENT_TELLSTICKNET,
+    SERVICE_CAPTURE,
+    SERVICE_PAIR,
+    SERVICE_REDISCOVER,
+    SIGNAL_ENTRY_UPDATED,
+)
+from .tellsticknet import (
+    MAX_DEVICE_CODE,
+    PAIRING_FRAMES,
+    async_get_tellstick,
+    async_release_tellstick,
+)
 
 # Loading the config flow file will register the flow
 from .config_flow import configured_hosts
@@ -18,6 +37,8 @@ REQUIREMENTS = []
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = [Platform.LIGHT, Platform.SENSOR]
+
 CONF_BRIDGES = "bridges"
 
 BRIDGE_CONFIG_SCHEMA = vol.Schema(
@@ -27,6 +48,30 @@ BRIDGE_CONFIG_SCHEMA = vol.Schema(
     }
 )
 
+PAIR_SCHEMA = vol.Schema(
+    {
+        vol.Optional("device_code"): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=MAX_DEVICE_CODE)
+        ),
+        vol.Optional("group_code", default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=15)
+        ),
+        vol.Optional("unpair", default=False): cv.boolean,
+        vol.Optional("frames", default=PAIRING_FRAMES): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=20)
+        ),
+        vol.Optional("tellstick"): cv.string,
+    }
+)
+
+CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=30): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=600)
+        ),
+    }
+)
+
 # CONFIG_SCHEMA = vol.Schema(
 #     {
 #         DOMAIN: vol.Schema(
@@ -142,31 +187,171 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Raxa TellstickNet component from yaml configuration."""
     hass.data.setdefault(DOMAIN, {})
 
+    @callback
+    def async_handle_rediscover(call: ServiceCall) -> None:
+        tellstick = hass.data[DOMAIN].get(DATA_TELLSTICK)
+        if tellstick is None:
+            _LOGGER.warning("No TellstickNet is running, nothing to rediscover")
+            return
+        tellstick.async_rediscover()
+
+    hass.services.async_register(DOMAIN, SERVICE_REDISCOVER, async_handle_rediscover)
+
+    @callback
+    def async_handle_pair(call: ServiceCall) -> None:
+        tellstick = hass.data[DOMAIN].get(DATA_TELLSTICK)
+        if tellstick is None:
+            _LOGGER.warning("No TellstickNet is running, can not pair")
+            return
+        device_code = call.data.get("device_code")
+        if device_code is None:
+            device_code = tellstick.async_unused_device_code()
+        group_code = call.data["group_code"]
+        unpair = call.data["unpair"]
+        tellstick.async_pair(
+            device_code,
+            group_code,
+            unpair,
+            call.data["frames"],
+            call.data.get("tellstick"),
+        )
+        hass.bus.async_fire(
+            EVENT_TELLSTICKNET,
+            {
+                "type": "unpairing_sent" if unpair else "pairing_sent",
+                "device_code": device_code,
+                "group_code": group_code,
+            },
+        )
+        if not unpair:
+            persistent_notification.async_create(
+                hass,
+                "Sent pairing frames. If the receiver paired, add it with:\n\n"
+                + _lights_yaml([("Paired light", device_code, group_code)]),
+                title="Raxa TellstickNet pairing",
+                notification_id=f"{DOMAIN}_pair",
+            )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PAIR, async_handle_pair, schema=PAIR_SCHEMA
+    )
+
+    @callback
+    def async_handle_capture(call: ServiceCall) -> None:
+        tellstick = hass.data[DOMAIN].get(DATA_TELLSTICK)
+        if tellstick is None:
+            _LOGGER.warning("No TellstickNet is running, can not capture")
+            return
+        if tellstick.capturing:
+            _LOGGER.warning("Already capturing remote frames")
+            return
+        tellstick.async_start_capture()
+
+        @callback
+        def async_finish_capture(_now: datetime) -> None:
+            captured = tellstick.async_stop_capture()
+            hass.bus.async_fire(
+                EVENT_TELLSTICKNET,
+                {
+                    "type": "capture_finished",
+                    "remotes": [
+                        {
+                            "device_code": device_code,
+                            "group_code": group_code,
+                            "frames": frames,
+                        }
+                        for (device_code, group_code), frames in captured.items()
+                    ],
+                },
+            )
+            if captured:
+                message = "Heard new remote codes, add them as lights with:\n\n"
+                message += _lights_yaml(
+                    [
+                        (f"Remote {device_code} {group_code}", device_code, group_code)
+                        for device_code, group_code in captured
+                    ]
+                )
+            else:
+                message = "No new remote codes were heard."
+            persistent_notification.async_create(
+                hass,
+                message,
+                title="Raxa TellstickNet capture",
+                notification_id=f"{DOMAIN}_capture",
+            )
+
+        async_call_later(hass, call.data["duration"], async_finish_capture)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_CAPTURE, async_handle_capture, schema=CAPTURE_SCHEMA
+    )
+
     # Forward the setup to the light platform.
     # hass.async_create_task(hass.config_entries.async_setup_platforms(config, ["light"]))
     return True
 
 
+def _lights_yaml(lights: list[tuple[str, int, int]]) -> str:
+    """Return light definitions for the bulk import as a YAML code block."""
+    lines = ["```yaml"]
+    for name, device_code, group_code in lights:
+        lines += [
+            f"- name: {name}",
+            f"  device_code: {device_code}",
+            f"  group_code: {group_code}",
+        ]
+    lines.append("```")
+    return "\n".join(lines)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up platform from a ConfigEntry."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
-
-    # Forward the setup to the light platform.
-    hass.async_create_task(
-        hass.config_entries.async_forward_entry_setup(entry, "light")
-    )
+    tellstick = await async_get_tellstick(hass)
 
-    hass_data = dict(entry.data)
+    hass_data = {**entry.data, **entry.options}
+    hass_data["unsub_static_hosts"] = [
+        tellstick.async_add_static_host(ip) for ip in hass_data.get(CONF_TELLSTICKS, [])
+    ]
+    hass_data["unsub_hub_options"] = tellstick.async_add_options(hass_data)
     # Registers update listener to update config entry when options are updated.
     unsub_options_update_listener = entry.add_update_listener(options_update_listener)
     # Store a reference to the unsubscribe function to cleanup if an entry is unloaded.
     hass_data["unsub_options_update_listener"] = unsub_options_update_listener
     hass.data[DOMAIN][entry.entry_id] = hass_data
 
+    # Forward the setup to the light platform.
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
     return True
 
 
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a config entry and release the shared TellstickNet."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass_data = hass.data[DOMAIN].pop(entry.entry_id)
+        hass_data["unsub_options_update_listener"]()
+        for unsub in hass_data["unsub_static_hosts"]:
+            unsub()
+        hass_data["unsub_hub_options"]()
+        await async_release_tellstick(hass)
+    return unload_ok
+
+
 async def options_update_listener(hass: HomeAssistant, config_entry: ConfigEntry):
-    """Handle options update."""
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    """Apply changed lights, groups, tellsticks and hub options without reloading."""
+    hass_data = hass.data[DOMAIN][config_entry.entry_id]
+    hass_data.update(config_entry.options)
+    tellstick = hass.data[DOMAIN][DATA_TELLSTICK]
+    unsub_static_hosts = hass_data["unsub_static_hosts"]
+    hass_data["unsub_static_hosts"] = [
+        tellstick.async_add_static_host(ip) for ip in hass_data.get(CONF_TELLSTICKS, [])
+    ]
+    for unsub in unsub_static_hosts:
+        unsub()
+    unsub_hub_options = hass_data["unsub_hub_options"]
+    hass_data["unsub_hub_options"] = tellstick.async_add_options(hass_data)
+    unsub_hub_options()
+    async_dispatcher_send(hass, SIGNAL_ENTRY_UPDATED.format(config_entry.entry_id))
@@ -1,11 +1,26 @@
+import csv
+import ipaddress
 from typing import Any, Dict, List, Optional
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
+from homeassistant.util.yaml import parse_yaml
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 
-from .light import LIGHT_SCHEMA
-from .const import DOMAIN, LOGGER
+from .light import LIGHT_SCHEMA, group_unique_id, light_unique_id
+from .const import (
+    CONF_DEDUP_WINDOW,
+    CONF_PACK_FRAMES,
+    CONF_TELLSTICKS,
+    DEFAULT_PAUSE,
+    DEFAULT_REPEATS,
+    DOMAIN,
+    HUB_OPTIONS,
+    LOGGER,
+)
+from .tellsticknet import DEDUP_WINDOW, MAX_REPEATS
 
 DEVICE_SCHEMA = vol.Schema(
     {
@@ -15,6 +30,15 @@ DEVICE_SCHEMA = vol.Schema(
         ),
         vol.Required("group_code"): vol.All(vol.Coerce(int), vol.Range(min=0, max=15)),
         vol.Optional("dimmable", default=False): bool,
+        vol.Optional("tellstick"): str,
+        vol.Optional("learn_route", default=False): bool,
+        vol.Optional("repeats", default=DEFAULT_REPEATS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_REPEATS)
+        ),
+        vol.Optional("pause", default=DEFAULT_PAUSE): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional("adaptive_repeats", default=False): bool,
         vol.Optional("add_another"): cv.boolean,
     }
 )
@@ -27,6 +51,118 @@ def configured_hosts(hass):
         entry.data["host"] for entry in hass.config_entries.async_entries(DOMAIN)
     )
 
+BULK_IMPORT_SCHEMA = vol.Schema(
+    {vol.Required("lights"): TextSelector(TextSelectorConfig(multiline=True))}
+)
+
+# Columns of a bulk import CSV without a header row.
+CSV_COLUMNS = ("name", "device_code", "group_code", "dimmable")
+BOOLEAN_FIELDS = ("dimmable", "learn_route", "adaptive_repeats")
+
+
+def _parse_csv(text: str) -> list[dict[str, str]]:
+    """Return the rows of a CSV paste as dicts."""
+    lines = [
+        line
+        for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+    rows = [[cell.strip() for cell in row] for row in csv.reader(lines)]
+    if rows and "name" in rows[0] and "device_code" in rows[0]:
+        columns = rows.pop(0)
+    else:
+        columns = list(CSV_COLUMNS)
+    result = []
+    for index, row in enumerate(rows, 1):
+        if len(row) > len(columns):
+            raise vol.Invalid(f"Row {index} has more than {len(columns)} columns")
+        result.append(dict(zip(columns, row)))
+    return result
+
+
+def parse_lights(text: str) -> list[dict[str, Any]]:
+    """Parse lights pasted as YAML or CSV, raises vol.Invalid on bad input.
+
+    YAML is a list of lights or a mapping with a lights key, like the
+    platform configuration. CSV has one light per row, with a header row
+    naming the columns or in the order of CSV_COLUMNS.
+    """
+    try:
+        parsed = parse_yaml(text)
+    except HomeAssistantError:
+        parsed = None
+    if isinstance(parsed, dict):
+        parsed = parsed.get("lights")
+    rows = parsed if isinstance(parsed, list) else _parse_csv(text)
+    if not rows:
+        raise vol.Invalid("No lights found")
+
+    lights = []
+    for index, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise vol.Invalid(f"Light {index} is not a mapping")
+        row = {key: value for key, value in row.items() if value not in (None, "")}
+        try:
+            for field in BOOLEAN_FIELDS:
+                if field in row:
+                    row[field] = cv.boolean(row[field])
+            lights.append(LIGHT_SCHEMA(row))
+        except vol.Invalid as err:
+            raise vol.Invalid(f"Light {index}: {err}") from err
+    return lights
+
+
+def parse_hosts(text: str) -> list[str]:
+    """Parse IPv4 addresses separated by commas or whitespace, raises vol.Invalid."""
+    hosts = []
+    for host in text.replace(",", " ").split():
+        try:
+            hosts.append(str(ipaddress.IPv4Address(host)))
+        except ValueError as err:
+            raise vol.Invalid(f"{host} is not an IPv4 address") from err
+    return list(dict.fromkeys(hosts))
+
+
+def merge_lights(
+    lights: list[dict[str, Any]], added: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Return lights with added ones appended, replacing lights with the same codes."""
+    merged = {light_unique_id(light): light for light in lights}
+    merged.update((light_unique_id(light), light) for light in added)
+    return list(merged.values())
+
+
+def remove_devices(
+    lights: list[dict[str, Any]], groups: list[dict[str, Any]], removed: set[str]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Return lights and groups without the removed unique ids.
+
+    Removed lights are also removed from groups, groups left without members
+    are removed.
+    """
+    lights = [light for light in lights if light_unique_id(light) not in removed]
+    kept = []
+    for group in groups:
+        members = [member for member in group["members"] if member not in removed]
+        if members and group_unique_id(group) not in removed:
+            kept.append({**group, "members": members})
+    return lights, kept
+
+
+def light_from_input(user_input: dict[str, Any]) -> dict[str, Any]:
+    """Return a light configuration from the add device form."""
+    return {
+        "name": user_input["name"],
+        "device_code": user_input["device_code"],
+        "group_code": user_input["group_code"],
+        "dimmable": user_input["dimmable"],
+        "tellstick": user_input.get("tellstick"),
+        "learn_route": user_input["learn_route"],
+        "repeats": user_input["repeats"],
+        "pause": user_input["pause"],
+        "adaptive_repeats": user_input["adaptive_repeats"],
+    }
+
 
 @config_entries.HANDLERS.register(DOMAIN)
 class RaxaTellstickNetConfigFlow(config_entries.ConfigFlow):
@@ -39,34 +175,56 @@ class RaxaTellstickNetConfigFlow(config_entries.ConfigFlow):
     data: Optional[Dict[str, Any]] = None
 
     async def async_step_user(self, user_input: dict[str, Any] | None = None):
+        """Add lights one at a time or import them in bulk."""
+        return self.async_show_menu(
+            step_id="user", menu_options=["add_device", "bulk_import"]
+        )
+
+    async def async_step_add_device(self, user_input: dict[str, Any] | None = None):
         if self.data is None:
             self.data = {}
             self.data["lights"] = []
 
         if user_input is not None:
             # Input is valid, set data.
-            self.data["lights"].append(
-                {
-                    "name": user_input["name"],
-                    "device_code": user_input["device_code"],
-                    "group_code": user_input["group_code"],
-                    "dimmable": user_input["dimmable"],
-                }
-            )
+            self.data["lights"].append(light_from_input(user_input))
 
             # If user ticked the box show this form again so they can add an
             # additional repo.
             if user_input.get("add_another", False):
-                return await self.async_step_user()
+                return await self.async_step_add_device()
 
             # User is done adding lights, create the config entry.
             return self.async_create_entry(title="Raxa TellstickNet", data=self.data)
 
         return self.async_show_form(
-            step_id="user",
+            step_id="add_device",
             data_schema=DEVICE_SCHEMA,
         )
 
+    async def async_step_bulk_import(self, user_input: dict[str, Any] | None = None):
+        """Create the entry from lights pasted as YAML or CSV."""
+        errors = {}
+        placeholders = {"error": ""}
+        if user_input is not None:
+            try:
+                lights = parse_lights(user_input["lights"])
+            except vol.Invalid as err:
+                errors["base"] = "invalid_import"
+                placeholders["error"] = str(err)
+            else:
+                return self.async_create_entry(
+                    title="Raxa TellstickNet",
+                    data={"lights": merge_lights([], lights)},
+                )
+
+        return self.async_show_form(
+            step_id="bulk_import",
+            data_schema=BULK_IMPORT_SCHEMA,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -75,28 +233,51 @@ class RaxaTellstickNetConfigFlow(config_entries.ConfigFlow):
 
 
 class OptionsFlowHandler(config_entries.OptionsFlow):
-    """Handles options flow for the component."""
+    """Handles options flow for the component.
+
+    Options hold the complete lights, groups, tellsticks and hub options,
+    replacing those in the entry data, so every step saves all of them.
+    """
 
     data: Optional[Dict[str, Any]] = None
 
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         self.config_entry = config_entry
+        config = {**config_entry.data, **config_entry.options}
+        self.lights: list[dict[str, Any]] = list(config.get("lights", []))
+        self.groups: list[dict[str, Any]] = list(config.get("groups", []))
+        self.tellsticks: list[str] = list(config.get(CONF_TELLSTICKS, []))
+        # Options of the shared hub, only saved once set in the hub step.
+        self.hub: dict[str, Any] = {
+            key: config[key] for key in HUB_OPTIONS if key in config
+        }
+
+    @callback
+    def _async_save(self):
+        """Save the options, the entry applies them without a reload."""
+        return self.async_create_entry(
+            title="",
+            data={
+                "lights": self.lights,
+                "groups": self.groups,
+                CONF_TELLSTICKS: self.tellsticks,
+                **self.hub,
+            },
+        )
 
     async def async_step_init(
         self, user_input: Dict[str, Any] = None
     ) -> Dict[str, Any]:
-        if user_input is not None:
-            if user_input["action"] == "remove_device":
-                return await self.async_step_remove_device()
-            return await self.async_step_add_device()
-
-        return self.async_show_form(
+        return self.async_show_menu(
             step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Required("action"): vol.In(["add_device", "remove_device"]),
-                }
-            ),
+            menu_options=[
+                "add_device",
+                "add_group",
+                "bulk_import",
+                "remove_device",
+                "tellsticks",
+                "hub",
+            ],
         )
 
     async def async_step_add_device(self, user_input: dict[str, Any] | None = None):
@@ -106,27 +287,142 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         if user_input is not None:
             # Input is valid, set data.
-            self.data["lights"].append(
-                {
-                    "name": user_input["name"],
-                    "device_code": user_input["device_code"],
-                    "group_code": user_input["group_code"],
-                    "dimmable": user_input["dimmable"],
-                }
-            )
+            self.data["lights"].append(light_from_input(user_input))
 
             # If user ticked the box show this form again so they can add an
             # additional repo.
             if user_input.get("add_another", False):
                 return await self.async_step_add_device()
 
-            # User is done adding lights, create the config entry.
-            return self.async_create_entry(title="Raxa TellstickNet", data=self.data)
+            # User is done adding lights, add them to the configured ones.
+            self.lights = merge_lights(self.lights, self.data["lights"])
+            return self._async_save()
 
         return self.async_show_form(
             step_id="add_device",
             data_schema=DEVICE_SCHEMA,
         )
 
+    async def async_step_bulk_import(self, user_input: dict[str, Any] | None = None):
+        """Add or update lights pasted as YAML or CSV."""
+        errors = {}
+        placeholders = {"error": ""}
+        if user_input is not None:
+            try:
+                lights = parse_lights(user_input["lights"])
+            except vol.Invalid as err:
+                errors["base"] = "invalid_import"
+                placeholders["error"] = str(err)
+            else:
+                self.lights = merge_lights(self.lights, lights)
+                return self._async_save()
+
+        return self.async_show_form(
+            step_id="bulk_import",
+            data_schema=BULK_IMPORT_SCHEMA,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_add_group(self, user_input: dict[str, Any] | None = None):
+        """Add a light group switching configured lights with one burst.
+
+        Groups are identified by name, so names must be unique.
+        """
+        lights = {light_unique_id(light): light["name"] for light in self.lights}
+        data_schema = vol.Schema(
+            {
+                vol.Required("name"): str,
+                vol.Required("members"): cv.multi_select(lights),
+                vol.Optional("group_address", default=False): bool,
+            }
+        )
+        errors = {}
+
+        if user_input is not None:
+            group = {
+                "name": user_input["name"],
+                "members": user_input["members"],
+                "group_address": user_input["group_address"],
+            }
+            if any(
+                group_unique_id(other) == group_unique_id(group) for other in self.groups
+            ):
+                errors["name"] = "group_exists"
+                data_schema = self.add_suggested_values_to_schema(data_schema, group)
+            else:
+                self.groups.append(group)
+                return self._async_save()
+
+        return self.async_show_form(
+            step_id="add_group", data_schema=data_schema, errors=errors
+        )
+
     async def async_step_remove_device(self, user_input: dict[str, Any] | None = None):
-        pass
+        """Remove lights and groups, lights are also removed from their groups."""
+        choices = {light_unique_id(light): light["name"] for light in self.lights}
+        choices.update(
+            (group_unique_id(group), "{} (group)".format(group["name"]))
+            for group in self.groups
+        )
+
+        if user_input is not None:
+            self.lights, self.groups = remove_devices(
+                self.lights, self.groups, set(user_input["devices"])
+            )
+            return self._async_save()
+
+        return self.async_show_form(
+            step_id="remove_device",
+            data_schema=vol.Schema(
+                {vol.Required("devices", default=[]): cv.multi_select(choices)}
+            ),
+        )
+
+    async def async_step_tellsticks(self, user_input: dict[str, Any] | None = None):
+        """Set tellstick addresses that are used without waiting for discovery."""
+        errors = {}
+        placeholders = {"error": ""}
+        if user_input is not None:
+            try:
+                self.tellsticks = parse_hosts(user_input[CONF_TELLSTICKS])
+            except vol.Invalid as err:
+                errors["base"] = "invalid_host"
+                placeholders["error"] = str(err)
+            else:
+                return self._async_save()
+
+        return self.async_show_form(
+            step_id="tellsticks",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_TELLSTICKS, default=", ".join(self.tellsticks)
+                    ): str,
+                }
+            ),
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_hub(self, user_input: dict[str, Any] | None = None):
+        """Set options of the hub shared by every config entry."""
+        if user_input is not None:
+            self.hub = user_input
+            return self._async_save()
+
+        return self.async_show_form(
+            step_id="hub",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_DEDUP_WINDOW,
+                        default=self.hub.get(CONF_DEDUP_WINDOW, DEDUP_WINDOW),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                    vol.Optional(
+                        CONF_PACK_FRAMES,
+                        default=self.hub.get(CONF_PACK_FRAMES, False),
+                    ): bool,
+                }
+            ),
+        )
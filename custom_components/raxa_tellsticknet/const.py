@@ -3,3 +3,29 @@ import logging
 
 LOGGER = logging.getLogger("homeassistant.components.raxa_tellsticknet")
 DOMAIN = "raxa_tellsticknet"
+
+EVENT_TELLSTICKNET = "raxa_tellsticknet_event"
+
+# Key of the shared TellstickNet hub in hass.data[DOMAIN].
+DATA_TELLSTICK = "tellstick"
+
+COMMUNICATION_PORT = 42314
+BROADCAST_PORT = 30303
+
+# Config entry option listing tellstick addresses used without discovery.
+CONF_TELLSTICKS = "tellsticks"
+# Config entry options of the shared hub, see TellstickNet.async_add_options.
+CONF_DEDUP_WINDOW = "dedup_window"
+CONF_PACK_FRAMES = "pack_frames"
+HUB_OPTIONS = (CONF_DEDUP_WINDOW, CONF_PACK_FRAMES)
+
+DEFAULT_REPEATS = 8
+DEFAULT_PAUSE = 15
+
+# Sent with the entry id when the options of a config entry change.
+SIGNAL_ENTRY_UPDATED = "raxa_tellsticknet_entry_updated_{}"
+
+SERVICE_REDISCOVER = "rediscover"
+SERVICE_REPORT_DELIVERY = "report_delivery"
+SERVICE_PAIR = "pair"
+SERVICE_CAPTURE = "capture"
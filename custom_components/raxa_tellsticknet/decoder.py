@@ -0,0 +1,103 @@
+"""Decoding of RF messages reported by tellsticks in TSNETRC packets."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+
+def decode_arctech_selflearning(data: int) -> dict[str, Any]:
+    """Decode a Nexa selflearning remote frame."""
+    return {
+        "device_code": data >> 6,
+        "group_mode": bool(data & 0x20),
+        "method": "turnon" if data & 0x10 else "turnoff",
+        "group_code": data & 0xF,
+    }
+
+
+def decode_arctech_codeswitch(data: int) -> dict[str, Any] | None:
+    """Decode a Nexa code switch remote frame."""
+    method = {6: "turnoff", 14: "turnon"}.get(data >> 8 & 0xF)
+    if method is None:
+        return None
+    return {
+        "house": chr(ord("A") + (data & 0xF)),
+        "unit": (data >> 4 & 0xF) + 1,
+        "method": method,
+    }
+
+
+def decode_fineoffset(data: int) -> dict[str, Any]:
+    """Decode a Fine Offset temperature/humidity sensor."""
+    data >>= 8  # Checksum
+    humidity = data & 0xFF
+    data >>= 8
+    temperature = (data & 0x7FF) / 10
+    if data & 0x800:
+        temperature = -temperature
+    data >>= 12
+    result: dict[str, Any] = {"id": data & 0xFF, "temperature": temperature}
+    if humidity <= 100:
+        result["humidity"] = humidity
+    return result
+
+
+def decode_mandolyn(data: int) -> dict[str, Any]:
+    """Decode a Mandolyn/Summerbird temperature/humidity sensor."""
+    data >>= 1  # Parity
+    temperature = round(((data & 0x7FFF) - 6400) / 128, 1)
+    data >>= 15
+    humidity = data & 0x7F
+    data >>= 10  # Battery and two unknown bits
+    channel = (data & 0x3) + 1
+    data >>= 2
+    return {
+        "id": (data & 0xF) * 10 + channel,
+        "temperature": temperature,
+        "humidity": humidity,
+    }
+
+
+# Decoders by protocol and model, a model of None matches any model.
+DECODERS: dict[tuple[str, str | None], Callable[[int], dict[str, Any] | None]] = {
+    ("arctech", "selflearning"): decode_arctech_selflearning,
+    ("arctech", "codeswitch"): decode_arctech_codeswitch,
+    ("fineoffset", None): decode_fineoffset,
+    ("mandolyn", None): decode_mandolyn,
+}
+
+
+def parse_fields(payload: str) -> dict[str, str]:
+    """Split a "key:value;key:value;" payload into its fields."""
+    fields = {}
+    for field in payload.split(";"):
+        key, separator, value = field.partition(":")
+        if separator:
+            fields[key] = value
+    return fields
+
+
+def decode_rf_message(payload: str) -> dict[str, Any]:
+    """Parse a TellStick style key/value payload into typed fields.
+
+    The class, protocol and model are always returned when present, decoded
+    fields are added for known protocols.
+    """
+    fields = parse_fields(payload)
+    result: dict[str, Any] = {
+        key: fields[key] for key in ("class", "protocol", "model") if key in fields
+    }
+    protocol = fields.get("protocol")
+    decoder = DECODERS.get((protocol, fields.get("model"))) or DECODERS.get(
+        (protocol, None)
+    )
+    if decoder is None:
+        return result
+    try:
+        data = int(fields["data"], 16)
+    except (KeyError, ValueError):
+        return result
+    decoded = decoder(data)
+    if decoded is not None:
+        result.update(decoded)
+    return result
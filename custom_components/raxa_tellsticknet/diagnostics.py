@@ -0,0 +1,25 @@
+"""Diagnostics support for Raxa TellstickNet."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_TELLSTICK, DOMAIN
+
+TO_REDACT = {"activation_code"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry and the shared TellstickNet."""
+    tellstick = hass.data[DOMAIN].get(DATA_TELLSTICK)
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "tellstick": None
+        if tellstick is None
+        else async_redact_data(tellstick.diagnostics(), TO_REDACT),
+    }
@@ -1,14 +1,28 @@
 """Platform for light integration."""
 from __future__ import annotations
+from dataclasses import replace
 from datetime import timedelta
 
-import socket
-import threading
-import async_timeout
-from typing import Any, List, Optional
+from typing import Any, List
 
 import voluptuous as vol
-from .const import DOMAIN, LOGGER
+from .const import (
+    DATA_TELLSTICK,
+    DEFAULT_PAUSE,
+    DEFAULT_REPEATS,
+    DOMAIN,
+    LOGGER,
+    SERVICE_REPORT_DELIVERY,
+    SIGNAL_ENTRY_UPDATED,
+)
+from .protocol import DIM, OFF, ON
+from .tellsticknet import (
+    MAX_REPEATS,
+    Command,
+    TellstickNet,
+    async_get_tellstick,
+    async_release_tellstick,
+)
 
 # Import the device class from the component that you want to support
 from homeassistant.components.light import (
@@ -18,11 +32,23 @@ from homeassistant.components.light import (
     ColorMode,
 )
 from homeassistant import config_entries, core
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, STATE_OFF, STATE_ON
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Context,
+    Event,
+    HomeAssistant,
+    callback,
+)
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
 
@@ -35,6 +61,24 @@ LIGHT_SCHEMA = vol.Schema(
         ),
         vol.Required("group_code"): vol.All(vol.Coerce(int), vol.Range(min=0, max=15)),
         vol.Optional("dimmable", default=False): bool,
+        vol.Optional("tellstick"): str,
+        vol.Optional("learn_route", default=False): bool,
+        vol.Optional("repeats", default=DEFAULT_REPEATS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_REPEATS)
+        ),
+        vol.Optional("pause", default=DEFAULT_PAUSE): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional("adaptive_repeats", default=False): bool,
+    }
+)
+
+# Members are the unique ids of lights, "<device_code>::<group_code>".
+GROUP_SCHEMA = vol.Schema(
+    {
+        vol.Required("name"): str,
+        vol.Required("members"): vol.All(cv.ensure_list, [str], vol.Length(min=1)),
+        vol.Optional("group_address", default=False): bool,
     }
 )
 
@@ -42,13 +86,97 @@ LIGHT_SCHEMA = vol.Schema(
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required("lights"): vol.All(cv.ensure_list, [LIGHT_SCHEMA]),
+        vol.Optional("groups", default=[]): vol.All(cv.ensure_list, [GROUP_SCHEMA]),
     }
 )
 
-COMMUNICATION_PORT = 42314
-BROADCAST_PORT = 30303
 
-tellstick: TellstickNet | None = None
+def light_unique_id(light: dict) -> str:
+    """Return the unique id of a configured light."""
+    return "{}::{}".format(light["device_code"], light["group_code"])
+
+
+def group_unique_id(group: dict) -> str:
+    """Return the unique id of a configured light group."""
+    return "group::{}".format(group["name"])
+
+
+def is_interactive(context: Context | None) -> bool:
+    """Return if a service call was made by a user rather than an automation."""
+    return context is not None and context.user_id is not None
+
+
+def create_entities(
+    tellstick: TellstickNet,
+    config: dict,
+    existing: dict[str, LightEntity] | None = None,
+) -> dict[str, LightEntity]:
+    """Return the lights and light groups of a configuration by unique id.
+
+    Entities in existing are reused when their configuration is unchanged.
+    """
+    existing = existing or {}
+    lights: dict[str, NexaSelfLearningLight] = {}
+    for light_config in config["lights"]:
+        unique_id = light_unique_id(light_config)
+        light = existing.get(unique_id)
+        if not isinstance(light, NexaSelfLearningLight) or light.config != light_config:
+            light = NexaSelfLearningLight(tellstick, light_config)
+        lights[unique_id] = light
+    entities: dict[str, LightEntity] = dict(lights)
+    for group_config in config.get("groups", ()):
+        members = [
+            lights[unique_id] for unique_id in group_config["members"] if unique_id in lights
+        ]
+        if len(members) < len(group_config["members"]):
+            LOGGER.warning(
+                "Light group %s has members that are not configured: %s",
+                group_config["name"],
+                ", ".join(set(group_config["members"]) - lights.keys()),
+            )
+        if not members:
+            continue
+        unique_id = group_unique_id(group_config)
+        if unique_id in entities:
+            LOGGER.warning(
+                "Light group %s is configured more than once, using the first",
+                group_config["name"],
+            )
+            continue
+        group = existing.get(unique_id)
+        if (
+            not isinstance(group, NexaLightGroup)
+            or group.config != group_config
+            or group.members != members
+        ):
+            group = NexaLightGroup(tellstick, group_config, members)
+        entities[unique_id] = group
+    return entities
+
+
+async def async_remove_entity(hass: HomeAssistant, entity: LightEntity) -> None:
+    """Remove a light or group deleted from the configuration and its registry entries."""
+    entity_registry = er.async_get(hass)
+    if entity.entity_id and entity_registry.async_get(entity.entity_id):
+        # The entity removes itself when its registry entry goes away.
+        entity_registry.async_remove(entity.entity_id)
+    elif entity.hass is not None:
+        await entity.async_remove(force_remove=True)
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device({(DOMAIN, entity.unique_id)})
+    if device is not None:
+        device_registry.async_remove_device(device.id)
+
+
+@callback
+def async_setup_entity_services() -> None:
+    """Register the light services of the platform being set up."""
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_REPORT_DELIVERY,
+        {vol.Required("delivered"): cv.boolean},
+        "async_report_delivery",
+    )
 
 
 async def async_setup_platform(
@@ -58,13 +186,14 @@ async def async_setup_platform(
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
     LOGGER.warn("light setup_platform")
-    global tellstick
-    if tellstick is None:
-        tellstick = TellstickNet(hass)
-        async with async_timeout.timeout(30):
-            await hass.async_add_executor_job(lambda: tellstick.start())
-    lights = [NexaSelfLearningLight(tellstick, light) for light in config["lights"]]
-    add_entities(lights)
+    tellstick = await async_get_tellstick(hass)
+
+    async def async_release(event: Event) -> None:
+        await async_release_tellstick(hass)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_release)
+    add_entities(create_entities(tellstick, config).values())
+    async_setup_entity_services()
 
 
 async def async_setup_entry(
@@ -77,115 +206,122 @@ async def async_setup_entry(
     if config_entry.options:
         config.update(config_entry.options)
     LOGGER.warn("light async_setup_entry %s", config)
-    global tellstick
-    if tellstick is None:
-        tellstick = TellstickNet(hass)
-        async with async_timeout.timeout(30):
-            await hass.async_add_executor_job(lambda: tellstick.start())
-    lights = [NexaSelfLearningLight(tellstick, light) for light in config["lights"]]
-    add_entities(lights)
-
-
-class TellstickNet:
-    """Communicates with the tellsticks"""
-
-    tellsticks: set[socket.socket] = set()
-
-    def __init__(self, hass: HomeAssistant) -> None:
-        self._hass = hass
-        self._run_event = threading.Event()
-        self._thread = threading.Thread(target=self.listen, daemon=True)
-
-    def start(self) -> None:
-        LOGGER.debug("TellstickNet starting")
-        self._thread.start()
-        LOGGER.debug("  Thread started")
-        self._run_event.wait()
-        LOGGER.debug("  Event set")
-        self.discover()
-        LOGGER.debug("  Discovered")
-
-    def listen(self):
-        LOGGER.debug("starting listen")
-        self._sock = socket.socket(
-            socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP
-        )
-        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self._sock.bind(("0.0.0.0", COMMUNICATION_PORT))
-        LOGGER.debug("started listening")
-
-        self._run_event.set()
-
-        while self._run_event.is_set():
-            (data, addr) = self._sock.recvfrom(1024)
-            message = data.decode()
-            LOGGER.debug("Received %r from %s" % (message, addr))
-            if message.startswith("TellStickNet"):
-                _header, mac, activation_code, version = message.split(":")
-                LOGGER.debug("Found tellstick: {mac} {activation_code} {version}")
-                self._hass.bus.fire(
-                    "raxa_tellsticknet_event",
-                    {
-                        "mac": mac,
-                        "activation_code": activation_code,
-                        "version": version,
-                        "type": "tellstick_detected",
-                    },
-                )
-            elif message.startswith("TSNETRC") and not message.endswith("data:;\r\n"):
-                self._hass.bus.fire(
-                    "raxa_tellsticknet_event",
-                    {
-                        "data": message.removeprefix("TSNETRC").removesuffix("\r\n"),
-                        "type": "message_received",
-                    },
-                )
-            ip, port = addr
-            self.tellsticks.add(ip)
-
-    def stop(self):
-        self._run_event.clear()
-        self._sock.close()
-        self._thread.join()
-
-    def discover(self):
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.sendto(b"D", ("255.255.255.255", BROADCAST_PORT))
-
-    def send(self, message: bytes, repeats=8, pause=15):
-        buffer = (
-            b"4:sendh1:S"
-            + bytes(hex(len(message))[2:].upper(), "latin1")
-            + b":"
-            + message
-            + b"1:Pi"
-            + bytes(hex(pause)[2:].upper(), "latin1")
-            + b"s1:Ri"
-            + bytes(hex(repeats)[2:].upper(), "latin1")
-            + b"ss"
+    tellstick = hass.data[DOMAIN][DATA_TELLSTICK]
+    entities = create_entities(tellstick, config)
+    add_entities(entities.values())
+    async_setup_entity_services()
+
+    async def async_update_entities() -> None:
+        """Replace the entities changed by an options update, keep the others."""
+        nonlocal entities
+        updated = create_entities(tellstick, config, entities)
+        for unique_id, entity in entities.items():
+            if updated.get(unique_id) is entity:
+                continue
+            if unique_id not in updated:
+                await async_remove_entity(hass, entity)
+            elif entity.hass is not None:
+                await entity.async_remove()
+        added = [
+            entity
+            for unique_id, entity in updated.items()
+            if entities.get(unique_id) is not entity
+        ]
+        entities = updated
+        add_entities(added)
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_ENTRY_UPDATED.format(config_entry.entry_id),
+            async_update_entities,
         )
-        LOGGER.warn("light send %s", str(buffer))
-        for ip in self.tellsticks:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                sock.sendto(buffer, (ip, COMMUNICATION_PORT))
+    )
 
 
-class NexaSelfLearningLight(LightEntity):
+class NexaSelfLearningLight(LightEntity, RestoreEntity):
     def __init__(self, tellstick: TellstickNet, light) -> None:
+        self.config = light
         self._tellstick = tellstick
         self._name = light["name"]
-        self._unique_id = "{}::{}".format(light["device_code"], light["group_code"])
+        self._unique_id = light_unique_id(light)
         self._device_code = light["device_code"]
         self._group_code = light["group_code"]
         self._dimmable = light["dimmable"]
+        self._tellstick_mac = light.get("tellstick") or None
+        self._learn_route = light.get("learn_route", False)
+        self._repeats = light.get("repeats", DEFAULT_REPEATS)
+        self._pause = light.get("pause", DEFAULT_PAUSE)
+        self._adaptive_repeats = light.get("adaptive_repeats", False)
         self._state = None
         self._brightness = None
+        # Light groups following the state of this light.
+        self._listeners: list[CALLBACK_TYPE] = []
         LOGGER.debug("NexaSelfLearningLight {self._name}")
 
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state and register with the tellstick.
+
+        The tellstick reports remote frames for the light and lets it share
+        group frames.
+        """
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state in (STATE_ON, STATE_OFF):
+            self._state = last_state.state == STATE_ON
+            if self._dimmable:
+                self._brightness = last_state.attributes.get(ATTR_BRIGHTNESS)
+        self.async_on_remove(
+            self._tellstick.async_register_light(
+                self._device_code, self._group_code, self._async_handle_remote
+            )
+        )
+
+    @callback
+    def _async_handle_remote(self, on: bool) -> None:
+        """Follow a remote switching the same receiver."""
+        self._state = on
+        self._async_write_state()
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call update_callback when the state changes, returns a function removing it."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_assume_state(self, on: bool, brightness: int | None = None) -> None:
+        """Take the state a light group sent to this light.
+
+        Listeners are not called, the group writes its own state once.
+        """
+        self._state = on
+        if brightness is not None and self._dimmable:
+            self._brightness = brightness
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    @callback
+    def _async_write_state(self) -> None:
+        """Write the state and update the groups following it."""
+        self.async_write_ha_state()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @property
+    def device_code(self) -> int:
+        """Return the device code the light is paired with."""
+        return self._device_code
+
+    @property
+    def dimmable(self) -> bool:
+        """Return if the light is dimmable."""
+        return self._dimmable
+
     @property
     def device_info(self) -> DeviceInfo:
         return DeviceInfo(
@@ -204,6 +340,11 @@ class NexaSelfLearningLight(LightEntity):
         """Return a unique ID."""
         return self._unique_id
 
+    @property
+    def should_poll(self) -> bool:
+        """State follows sent commands and received remote frames."""
+        return False
+
     @property
     def assumed_state(self) -> str:
         return True
@@ -233,37 +374,54 @@ class NexaSelfLearningLight(LightEntity):
         """Return true if light is on."""
         return self._state
 
-    def turn_on(self, **kwargs: Any) -> None:
+    def command(
+        self, action: int, dim_level: int | None = None, interactive: bool = False
+    ) -> Command:
+        """Return a command addressed to this light."""
+        return Command(
+            self._device_code,
+            self._group_code,
+            action,
+            dim_level,
+            repeats=self._repeats,
+            pause=self._pause,
+            tellstick=self._tellstick_mac,
+            learn_route=self._learn_route,
+            adaptive=self._adaptive_repeats,
+            interactive=interactive,
+        )
+
+    async def async_report_delivery(self, delivered: bool) -> None:
+        """Tell adaptive repeats if the last command reached the receiver."""
+        self._tellstick.async_report_delivery(
+            self._device_code, self._group_code, delivered
+        )
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
         """Instruct the light to turn on.
 
         You can skip the brightness part if your light does not support
         brightness control.
         """
         brightness = kwargs.get(ATTR_BRIGHTNESS)
-        # self._light.turn_on()
+        interactive = is_interactive(self._context)
         if brightness is None:
-            self._tellstick.send(
-                self_learning_pulse(self._device_code, False, self._group_code, ON)
-            )
+            self._tellstick.async_queue_command(self.command(ON, None, interactive))
         else:
-            self._tellstick.send(
-                self_learning_pulse(
-                    self._device_code,
-                    False,
-                    self._group_code,
-                    DIM,
-                    int(brightness / 256.0 * 16),
-                )
+            self._tellstick.async_queue_command(
+                self.command(DIM, int(brightness / 256.0 * 16), interactive)
             )
         self._state = True
         self._brightness = brightness
+        self._async_write_state()
 
-    def turn_off(self, **kwargs: Any) -> None:
+    async def async_turn_off(self, **kwargs: Any) -> None:
         """Instruct the light to turn off."""
-        self._tellstick.send(
-            self_learning_pulse(self._device_code, False, self._group_code, OFF)
+        self._tellstick.async_queue_command(
+            self.command(OFF, None, is_interactive(self._context))
         )
         self._state = False
+        self._async_write_state()
 
     # def update(self) -> None:
     #     """Fetch new state data for this light.
@@ -275,57 +433,119 @@ class NexaSelfLearningLight(LightEntity):
     #     self._brightness = self._light.brightness
 
 
-OFF = 0
-ON = 1
-DIM = 2
+class NexaLightGroup(LightEntity):
+    """Switches a set of Nexa lights with one burst of frames.
 
+    With group_address the group sends a single group mode frame to the
+    device_code its members share, which switches every receiver paired
+    with the code, including receivers that are not members.
+    """
 
-def self_learning_pulse(
-    device_code: int,
-    group_mode: bool,
-    group_code: int,
-    action: int,
-    dim_level: Optional[int] = None,
-) -> bytes:
-    T = 26
-    T5 = T * 5
-    ZERO = bytes([T, T, T, T5])
-    ONE = bytes([T, T5, T, T])
-    DIM_BIT = bytes([T, T, T, T])
+    def __init__(
+        self,
+        tellstick: TellstickNet,
+        group: dict,
+        members: list[NexaSelfLearningLight],
+    ) -> None:
+        """Initialize the group, falling back to member frames for mixed codes."""
+        self.config = group
+        self.members = members
+        self._tellstick = tellstick
+        self._attr_name = group["name"]
+        self._attr_unique_id = group_unique_id(group)
+        self._group_address = group.get("group_address", False)
+        if self._group_address and len({member.device_code for member in members}) > 1:
+            LOGGER.warning(
+                "Light group %s has members with different device codes, "
+                "sending one frame per member instead of a group frame",
+                group["name"],
+            )
+            self._group_address = False
+        if all(member.dimmable for member in members):
+            self._attr_supported_color_modes = {ColorMode.BRIGHTNESS}
+            self._attr_color_mode = ColorMode.BRIGHTNESS
+        else:
+            self._attr_supported_color_modes = {ColorMode.ONOFF}
+            self._attr_color_mode = ColorMode.ONOFF
 
-    pulse = bytes([T, 254])
+    async def async_added_to_hass(self) -> None:
+        """Follow the state of the members."""
+        for member in self.members:
+            self.async_on_remove(member.async_add_listener(self.async_write_ha_state))
 
-    for i in range(25, -1, -1):
-        if (device_code & (1 << i)) == 0:
-            pulse += ZERO
-        else:
-            pulse += ONE
-
-    if group_mode:
-        pulse += ONE
-    else:
-        pulse += ZERO
-
-    if action == ON:
-        pulse += ONE
-    elif action == OFF:
-        pulse += ZERO
-    elif action == DIM:
-        pulse += DIM_BIT
-
-    for i in range(3, -1, -1):
-        if (group_code & (1 << i)) == 0:
-            pulse += ZERO
-        else:
-            pulse += ONE
+    @property
+    def should_poll(self) -> bool:
+        """State follows the members."""
+        return False
 
-    if action == DIM:
-        for i in range(3, -1, -1):
-            if (dim_level & (1 << i)) == 0:
-                pulse += ZERO
-            else:
-                pulse += ONE
+    @property
+    def assumed_state(self) -> bool:
+        """Return True, the members' states are assumed too."""
+        return True
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return true if any member is on."""
+        states = [member.is_on for member in self.members]
+        if all(state is None for state in states):
+            return None
+        return any(states)
+
+    @property
+    def brightness(self) -> int | None:
+        """Return the highest brightness of the members that are on."""
+        return max(
+            (
+                member.brightness
+                for member in self.members
+                if member.is_on and member.brightness is not None
+            ),
+            default=None,
+        )
 
-    pulse += bytes([T, 255])
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the unique ids of the members."""
+        return {"members": [member.unique_id for member in self.members]}
+
+    def _commands(
+        self, action: int, dim_level: int | None = None, interactive: bool = False
+    ) -> list[Command]:
+        """Return the commands that switch every member."""
+        commands = [
+            member.command(action, dim_level, interactive) for member in self.members
+        ]
+        if not self._group_address:
+            return commands
+        return [
+            replace(
+                commands[0],
+                group_code=0,
+                group_mode=True,
+                repeats=max(command.repeats for command in commands),
+                pause=max(command.pause for command in commands),
+                adaptive=False,
+            )
+        ]
 
-    return pulse
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn on every member in one burst."""
+        brightness = kwargs.get(ATTR_BRIGHTNESS)
+        interactive = is_interactive(self._context)
+        if brightness is None:
+            commands = self._commands(ON, None, interactive)
+        else:
+            commands = self._commands(DIM, int(brightness / 256.0 * 16), interactive)
+        self._tellstick.async_queue_commands(commands)
+        for member in self.members:
+            member.async_assume_state(True, brightness)
+        self.async_write_ha_state()
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn off every member in one burst."""
+        self._tellstick.async_queue_commands(
+            self._commands(OFF, None, is_interactive(self._context))
+        )
+        for member in self.members:
+            member.async_assume_state(False)
+        self.async_write_ha_state()
@@ -0,0 +1,294 @@
+"""Encoding of Nexa selflearning pulses and TellstickNet packets."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from functools import lru_cache
+import re
+from typing import Any, Optional
+
+from .decoder import decode_rf_message
+
+OFF = 0
+ON = 1
+DIM = 2
+
+T = 26
+T5 = T * 5
+ZERO = bytes([T, T, T, T5])
+ONE = bytes([T, T5, T, T])
+DIM_BIT = bytes([T, T, T, T])
+START = bytes([T, 254])
+END = bytes([T, 255])
+
+# Pulses for every 4 bit value, most significant bit first.
+NIBBLES = tuple(
+    b"".join(ONE if value & (1 << i) else ZERO for i in range(3, -1, -1))
+    for value in range(16)
+)
+ACTIONS = {OFF: ZERO, ON: ONE, DIM: DIM_BIT}
+SYMBOLS = {ZERO: OFF, ONE: ON, DIM_BIT: DIM}
+
+# Tables for the batch encoder: the pulses of every byte value, the start pulse
+# with the two high device code bits, and everything after the device code by
+# (group_mode, action, group_code, dim_level).
+BYTE_PULSES = tuple(NIBBLES[value >> 4] + NIBBLES[value & 0xF] for value in range(256))
+HEAD_PULSES = tuple(
+    START + (ONE if value & 2 else ZERO) + (ONE if value & 1 else ZERO)
+    for value in range(4)
+)
+TAIL_PULSES = {
+    (group_mode, action, group_code, dim_level): b"".join(
+        (
+            ONE if group_mode else ZERO,
+            ACTIONS[action],
+            NIBBLES[group_code],
+            b"" if dim_level is None else NIBBLES[dim_level],
+            END,
+        )
+    )
+    for group_mode in (False, True)
+    for action in ACTIONS
+    for group_code in range(16)
+    for dim_level in (range(16) if action == DIM else (None,))
+}
+# Sums of the pulse lengths in the tables, for air time without summing pulses.
+BYTE_SUMS = tuple(sum(pulse) for pulse in BYTE_PULSES)
+HEAD_SUMS = tuple(sum(pulse) for pulse in HEAD_PULSES)
+TAIL_SUMS = {key: sum(pulse) for key, pulse in TAIL_PULSES.items()}
+PREFIX_LENGTH = len(HEAD_PULSES[0]) + 3 * len(BYTE_PULSES[0])
+
+# Prefixes of RF messages and discovery replies, and the end of RF messages
+# without data.
+TSNETRC = b"TSNETRC"
+TELLSTICK_NET = b"TellStickNet:"
+EMPTY_DATA = b"data:;\r\n"
+
+ENVELOPE_HEADER = re.compile(rb"4:sendh1:S([0-9A-F]+):")
+ENVELOPE_TRAILER = re.compile(rb"1:Pi([0-9A-F]+)s1:Ri([0-9A-F]+)ss")
+
+
+@lru_cache(maxsize=256)
+def device_code_prefix(device_code: int) -> bytes:
+    """Return the start pulse followed by the 26 device code bits."""
+    return b"".join(
+        (
+            START,
+            ONE if device_code & (1 << 25) else ZERO,
+            ONE if device_code & (1 << 24) else ZERO,
+            NIBBLES[(device_code >> 20) & 0xF],
+            NIBBLES[(device_code >> 16) & 0xF],
+            NIBBLES[(device_code >> 12) & 0xF],
+            NIBBLES[(device_code >> 8) & 0xF],
+            NIBBLES[(device_code >> 4) & 0xF],
+            NIBBLES[device_code & 0xF],
+        )
+    )
+
+
+def self_learning_pulse(
+    device_code: int,
+    group_mode: bool,
+    group_code: int,
+    action: int,
+    dim_level: Optional[int] = None,
+) -> bytes:
+    return b"".join(
+        (
+            device_code_prefix(device_code),
+            ONE if group_mode else ZERO,
+            ACTIONS.get(action, b""),
+            NIBBLES[group_code & 0xF],
+            NIBBLES[dim_level & 0xF] if action == DIM else b"",
+            END,
+        )
+    )
+
+
+def send_envelope(message: bytes, repeats: int = 8, pause: int = 15) -> bytes:
+    """Wrap a pulse in a TellstickNet send command."""
+    return b"4:sendh1:S%X:%b1:Pi%Xs1:Ri%Xss" % (len(message), message, pause, repeats)
+
+
+def pulse_airtime(message: bytes, repeats: int = 8, pause: int = 15) -> float:
+    """Return the seconds a tellstick spends transmitting a pulse.
+
+    Pulse bytes are lengths in units of 10 µs and the pause in ms is kept
+    after every repeat.
+    """
+    return repeats * (sum(message) / 100000 + pause / 1000)
+
+
+@lru_cache(maxsize=1024)
+def encode_command(
+    device_code: int,
+    group_mode: bool,
+    group_code: int,
+    action: int,
+    dim_level: Optional[int],
+    repeats: int,
+    pause: int,
+) -> tuple[bytes, float]:
+    """Return the send envelope for a command and its air time."""
+    pulse = self_learning_pulse(device_code, group_mode, group_code, action, dim_level)
+    return send_envelope(pulse, repeats, pause), pulse_airtime(pulse, repeats, pause)
+
+
+def encode_commands(
+    commands: Iterable[tuple[int, bool, int, int, int | None, int, int]]
+) -> list[tuple[bytes, float]]:
+    """Return the send envelopes and air times of many commands.
+
+    Commands are the arguments of encode_command and the results are
+    identical, every envelope is joined from table lookups in one go.
+    """
+    byte_pulses = BYTE_PULSES
+    head_pulses = HEAD_PULSES
+    tail_pulses = TAIL_PULSES
+    byte_sums = BYTE_SUMS
+    head_sums = HEAD_SUMS
+    tail_sums = TAIL_SUMS
+    headers: dict[int, bytes] = {}
+    trailers: dict[tuple[int, int], bytes] = {}
+    result = []
+    for device_code, group_mode, group_code, action, dim_level, repeats, pause in commands:
+        high = device_code >> 24 & 0x3
+        middle = device_code >> 16 & 0xFF
+        low = device_code >> 8 & 0xFF
+        last = device_code & 0xFF
+        key = (
+            bool(group_mode),
+            action,
+            group_code & 0xF,
+            dim_level & 0xF if action == DIM else None,
+        )
+        tail = tail_pulses[key]
+        length = PREFIX_LENGTH + len(tail)
+        header = headers.get(length)
+        if header is None:
+            header = headers[length] = b"4:sendh1:S%X:" % length
+        trailer = trailers.get((repeats, pause))
+        if trailer is None:
+            trailer = trailers[(repeats, pause)] = b"1:Pi%Xs1:Ri%Xss" % (pause, repeats)
+        pulse_sum = (
+            head_sums[high]
+            + byte_sums[middle]
+            + byte_sums[low]
+            + byte_sums[last]
+            + tail_sums[key]
+        )
+        result.append(
+            (
+                b"".join(
+                    (
+                        header,
+                        head_pulses[high],
+                        byte_pulses[middle],
+                        byte_pulses[low],
+                        byte_pulses[last],
+                        tail,
+                        trailer,
+                    )
+                ),
+                repeats * (pulse_sum / 100000 + pause / 1000),
+            )
+        )
+    return result
+
+
+def parse_envelopes(buffer: bytes) -> list[tuple[bytes, int, int]]:
+    """Return the pulse, repeats and pause of every send envelope in a datagram."""
+    envelopes = []
+    position = 0
+    while True:
+        header = ENVELOPE_HEADER.match(buffer, position)
+        if header is None:
+            raise ValueError("Not a send envelope")
+        start = header.end()
+        end = start + int(header.group(1), 16)
+        trailer = ENVELOPE_TRAILER.match(buffer, end)
+        if trailer is None:
+            raise ValueError("Malformed send envelope")
+        envelopes.append(
+            (buffer[start:end], int(trailer.group(2), 16), int(trailer.group(1), 16))
+        )
+        position = trailer.end()
+        if position == len(buffer):
+            return envelopes
+
+
+def parse_envelope(buffer: bytes) -> tuple[bytes, int, int]:
+    """Return the pulse, repeats and pause of a datagram with one send envelope."""
+    envelopes = parse_envelopes(buffer)
+    if len(envelopes) != 1:
+        raise ValueError("More than one send envelope")
+    return envelopes[0]
+
+
+def decode_self_learning_pulse(
+    pulse: bytes,
+) -> tuple[int, bool, int, int, int | None]:
+    """Return device_code, group_mode, group_code, action and dim_level of a pulse."""
+    if not pulse.startswith(START) or not pulse.endswith(END):
+        raise ValueError("Not a selflearning pulse")
+    try:
+        symbols = [SYMBOLS[pulse[i : i + 4]] for i in range(2, len(pulse) - 2, 4)]
+    except KeyError as err:
+        raise ValueError("Unknown symbol in selflearning pulse") from err
+    if len(symbols) not in (32, 36) or DIM in symbols[:27] + symbols[28:]:
+        raise ValueError("Malformed selflearning pulse")
+
+    def value(bits: list[int]) -> int:
+        result = 0
+        for bit in bits:
+            result = result << 1 | bit
+        return result
+
+    return (
+        value(symbols[:26]),
+        symbols[26] == ON,
+        value(symbols[28:32]),
+        symbols[27],
+        value(symbols[32:]) if len(symbols) == 36 else None,
+    )
+
+
+@lru_cache(maxsize=256)
+def _parse_rf_message(data: bytes) -> dict[str, Any] | None:
+    """Return the event data of a TSNETRC packet, None if it has no data.
+
+    Cached since remotes repeat frames and sensors repeat readings, callers
+    get a copy. Only the payload is decoded to text.
+    """
+    if data.endswith(EMPTY_DATA):
+        return None
+    end = len(data) - 2 if data.endswith(b"\r\n") else len(data)
+    try:
+        payload = str(memoryview(data)[len(TSNETRC) : end], "ascii")
+    except UnicodeDecodeError:
+        return None
+    event = decode_rf_message(payload)
+    event["data"] = payload
+    event["type"] = "message_received"
+    return event
+
+
+def parse_message(data: bytes) -> dict[str, Any] | None:
+    """Parse a packet from a tellstick into event data, None if it is not an event.
+
+    Packets are recognized by their byte prefix before anything is decoded.
+    """
+    if data.startswith(TSNETRC):
+        event = _parse_rf_message(data)
+        return None if event is None else event.copy()
+    if data.startswith(TELLSTICK_NET):
+        fields = data.decode("ascii", "replace").split(":")
+        if len(fields) != 4:
+            return None
+        _header, mac, activation_code, version = fields
+        return {
+            "mac": mac,
+            "activation_code": activation_code,
+            "version": version,
+            "type": "tellstick_detected",
+        }
+    return None
@@ -0,0 +1,165 @@
+"""Diagnostic sensors for the shared TellstickNet hub."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DATA_TELLSTICK, DOMAIN
+from .tellsticknet import TellstickNet
+
+# The statistics live in memory, polling them is cheap.
+SCAN_INTERVAL = timedelta(seconds=30)
+# Every config entry shares one hub, its sensors and device are keyed on this.
+HUB_ID = "tellsticknet"
+
+
+@dataclass
+class TellstickNetSensorRequiredKeysMixin:
+    """Mixin for required keys."""
+
+    value_fn: Callable[[TellstickNet], float | int | None]
+
+
+@dataclass
+class TellstickNetSensorEntityDescription(
+    SensorEntityDescription, TellstickNetSensorRequiredKeysMixin
+):
+    """Describes a TellstickNet diagnostic sensor."""
+
+
+SENSORS: tuple[TellstickNetSensorEntityDescription, ...] = (
+    TellstickNetSensorEntityDescription(
+        key="packets_received",
+        name="Packets received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.stats.packets_received,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="discovery_replies",
+        name="Discovery replies",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.stats.discovery_replies,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="duplicates_suppressed",
+        name="Duplicates suppressed",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.duplicates.suppressed,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="frames_sent",
+        name="Frames sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.stats.frames_sent,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="datagrams_sent",
+        name="Datagrams sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.stats.datagrams_sent,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="bytes_sent",
+        name="Bytes sent",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: tellstick.stats.bytes_sent,
+    ),
+    TellstickNetSensorEntityDescription(
+        key="airtime",
+        name="Air time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda tellstick: round(tellstick.stats.airtime, 3),
+    ),
+    TellstickNetSensorEntityDescription(
+        key="send_latency",
+        name="Send latency p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda tellstick: tellstick.stats.send_latency.quantile(0.95),
+    ),
+    TellstickNetSensorEntityDescription(
+        key="queue_depth",
+        name="Queue depth",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda tellstick: tellstick.queue_depth,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the diagnostic sensors of the shared TellstickNet.
+
+    One entry at a time provides the sensors, when it is unloaded the next
+    loaded entry takes over.
+    """
+    tellstick: TellstickNet = hass.data[DOMAIN][DATA_TELLSTICK]
+    providers = tellstick.sensor_providers
+    entry_id = config_entry.entry_id
+
+    @callback
+    def async_add_sensors() -> None:
+        add_entities(TellstickNetSensor(tellstick, description) for description in SENSORS)
+
+    @callback
+    def async_remove_provider() -> None:
+        providing = next(iter(providers)) == entry_id
+        del providers[entry_id]
+        if providing and providers:
+            next(iter(providers.values()))()
+
+    providers[entry_id] = async_add_sensors
+    config_entry.async_on_unload(async_remove_provider)
+    if len(providers) == 1:
+        async_add_sensors()
+
+
+class TellstickNetSensor(SensorEntity):
+    """A statistic of the TellstickNet hub, disabled until enabled by the user."""
+
+    entity_description: TellstickNetSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        tellstick: TellstickNet,
+        description: TellstickNetSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor of a statistic."""
+        self._tellstick = tellstick
+        self.entity_description = description
+        self._attr_unique_id = f"{HUB_ID}::{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, HUB_ID)},
+            name="TellstickNet",
+            manufacturer="Telldus",
+            model="TellstickNet",
+        )
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the current value of the statistic."""
+        return self.entity_description.value_fn(self._tellstick)
@@ -0,0 +1,119 @@
+"""Counters and histograms describing the work done by the TellstickNet hub."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Any
+
+# Bucket upper bounds in milliseconds for send latency and lane wait times.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Bucket upper bounds for the number of commands and frames not yet sent.
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Counts observations in fixed buckets, cheap enough for the hot path."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize an empty histogram with the bucket upper bounds."""
+        self.buckets = buckets
+        # The last count holds observations above the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the observations, None before the first."""
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def quantile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding the q quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram in a JSON serializable form."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+            "buckets": {
+                **{f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class HubStats:
+    """Instrumentation of one TellstickNet hub."""
+
+    def __init__(self) -> None:
+        """Initialize zeroed statistics."""
+        self.packets_received = 0
+        self.bytes_received = 0
+        # Parsed packets by event type, "unknown" for packets that did not parse.
+        self.packets_by_type: Counter[str] = Counter()
+        self.discovery_replies = 0
+        self.discovery_requests = 0
+        self.commands_queued = 0
+        self.commands_coalesced = 0
+        # Commands held while no tellstick was live, and those given up on.
+        self.commands_held = 0
+        self.commands_expired = 0
+        # Commands replaced by a newer one to the same receiver before they
+        # were dispatched, and frames of such commands dropped by a lane.
+        self.commands_superseded = 0
+        self.frames_superseded = 0
+        self.frames_sent = 0
+        self.datagrams_sent = 0
+        self.bytes_sent = 0
+        self.airtime = 0.0
+        # Milliseconds spent in sendto and waiting on a lane for air time.
+        self.send_latency = Histogram(LATENCY_BUCKETS)
+        self.lane_wait = Histogram(LATENCY_BUCKETS)
+        # Commands and frames not yet sent, sampled when a command is queued.
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics in a JSON serializable form."""
+        return {
+            "packets_received": self.packets_received,
+            "bytes_received": self.bytes_received,
+            "packets_by_type": dict(self.packets_by_type),
+            "discovery_replies": self.discovery_replies,
+            "discovery_requests": self.discovery_requests,
+            "commands_queued": self.commands_queued,
+            "commands_coalesced": self.commands_coalesced,
+            "commands_held": self.commands_held,
+            "commands_expired": self.commands_expired,
+            "commands_superseded": self.commands_superseded,
+            "frames_superseded": self.frames_superseded,
+            "frames_sent": self.frames_sent,
+            "datagrams_sent": self.datagrams_sent,
+            "bytes_sent": self.bytes_sent,
+            "airtime": round(self.airtime, 3),
+            "send_latency_ms": self.send_latency.as_dict(),
+            "lane_wait_ms": self.lane_wait.as_dict(),
+            "queue_depth": self.queue_depth.as_dict(),
+        }
@@ -0,0 +1,1133 @@
+"""Communication with TellstickNet units over UDP."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+import logging
+import random
+import socket
+import time
+from typing import Any
+
+from homeassistant.components.network import async_get_ipv4_broadcast_addresses
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+
+from .const import (
+    BROADCAST_PORT,
+    COMMUNICATION_PORT,
+    CONF_DEDUP_WINDOW,
+    CONF_PACK_FRAMES,
+    DATA_TELLSTICK,
+    DEFAULT_PAUSE,
+    DEFAULT_REPEATS,
+    DOMAIN,
+    EVENT_TELLSTICKNET,
+    HUB_OPTIONS,
+    LOGGER,
+)
+from .protocol import (
+    OFF,
+    ON,
+    TSNETRC,
+    encode_command,
+    encode_commands,
+    parse_message,
+)
+from .stats import HubStats
+
+# How long the writer waits for more commands that could share a group frame.
+COALESCE_WINDOW = 0.05
+# Copies of a received RF message within this many seconds are dropped,
+# unless a config entry sets the dedup_window option.
+DEDUP_WINDOW = 0.5
+# Discovery starts at the min interval and backs off to the max interval.
+DISCOVERY_MIN_INTERVAL = 10
+DISCOVERY_MAX_INTERVAL = 300
+# Tellsticks not heard from get no commands after STALE_AFTER seconds and
+# are forgotten after EXPIRE_AFTER seconds.
+STALE_AFTER = 2 * DISCOVERY_MAX_INTERVAL + 60
+EXPIRE_AFTER = 3600
+# Bounds for adaptive repeats, and how long after its air time a command
+# must be heard by a tellstick to count as delivered.
+MIN_REPEATS = 2
+MAX_REPEATS = 16
+ECHO_TIMEOUT = 1.0
+# Frames queued for a tellstick are packed into datagrams of at most this
+# many bytes when a config entry sets the pack_frames option. Firmware does
+# not tell if or up to what size it accepts several envelopes per datagram,
+# so packing is off by default and the bound is a conservative choice.
+MAX_DATAGRAM_PAYLOAD = 512
+# Frames sent by a pairing burst, a receiver in learn mode pairs with the
+# first one it hears.
+PAIRING_FRAMES = 5
+# Device codes are 26 bits.
+MAX_DEVICE_CODE = (1 << 26) - 1
+# Seconds between attempts to open the UDP endpoint when the port is taken.
+START_RETRY_INTERVAL = 30
+# Commands dispatched while no tellstick is live are held until one is, at
+# most MAX_HELD_COMMANDS of them for at most HOLD_COMMANDS_FOR seconds.
+MAX_HELD_COMMANDS = 256
+HOLD_COMMANDS_FOR = 60
+# Discovery requests go here until the enabled network adapters are known.
+LIMITED_BROADCAST = "255.255.255.255"
+
+
+async def async_get_tellstick(hass: HomeAssistant) -> TellstickNet:
+    """Return the shared TellstickNet, starting it for the first user.
+
+    The hub starts in the background so setup does not wait on the network,
+    commands queue up until a tellstick is found. Every call must be paired
+    with async_release_tellstick.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    tellstick: TellstickNet | None = domain_data.get(DATA_TELLSTICK)
+    if tellstick is None:
+        tellstick = domain_data[DATA_TELLSTICK] = TellstickNet(hass)
+        tellstick.async_start_background()
+
+        async def async_stop_tellstick(event: Event) -> None:
+            domain_data.pop(DATA_TELLSTICK, None)
+            await tellstick.async_stop()
+
+        tellstick.unsub_stop = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, async_stop_tellstick
+        )
+    tellstick.references += 1
+    return tellstick
+
+
+async def async_release_tellstick(hass: HomeAssistant) -> None:
+    """Release the shared TellstickNet, stopping it after the last user."""
+    domain_data = hass.data.get(DOMAIN, {})
+    tellstick: TellstickNet | None = domain_data.get(DATA_TELLSTICK)
+    if tellstick is None:
+        return
+    tellstick.references -= 1
+    if tellstick.references > 0:
+        return
+    del domain_data[DATA_TELLSTICK]
+    if tellstick.unsub_stop is not None:
+        tellstick.unsub_stop()
+    await tellstick.async_stop()
+
+
+def normalize_mac(mac: str) -> str:
+    """Return a MAC address as upper case hex digits without separators."""
+    return mac.replace(":", "").replace("-", "").upper()
+
+
+@dataclass
+class TellstickInfo:
+    """A tellstick found on the network."""
+
+    ip: str
+    mac: str | None = None
+    activation_code: str | None = None
+    version: str | None = None
+    last_seen: float = 0.0
+    stale: bool = False
+    # Configured by address, never goes stale or expires.
+    static: bool = False
+
+
+@dataclass
+class Command:
+    """A selflearning command waiting to be sent."""
+
+    device_code: int
+    group_code: int
+    action: int
+    dim_level: int | None = None
+    group_mode: bool = False
+    repeats: int = DEFAULT_REPEATS
+    pause: int = DEFAULT_PAUSE
+    # MAC of the tellstick to send through, all tellsticks if None or not live.
+    tellstick: str | None = None
+    # Send through the tellstick that last heard a remote with the device_code.
+    learn_route: bool = False
+    # Tune repeats from observed delivery, starting from repeats.
+    adaptive: bool = False
+    # Requested by a user, sent ahead of automation traffic.
+    interactive: bool = False
+    # Replace an older command to the same receiver that was not sent yet.
+    supersede: bool = True
+    # Set when a newer command replaced this one, it is then not sent.
+    superseded: bool = field(default=False, init=False, compare=False)
+    # Lanes that have not yet sent or dropped the frame of this command.
+    unsent: int = field(default=0, init=False, compare=False, repr=False)
+
+    @property
+    def key(self) -> tuple[int, int, bool]:
+        """Return what receivers the command addresses."""
+        return (self.device_code, self.group_code, self.group_mode)
+
+    def overlaps(self, other: Command) -> bool:
+        """Return if the command addresses a receiver the other one does."""
+        return self.device_code == other.device_code and (
+            self.group_mode or other.group_mode or self.group_code == other.group_code
+        )
+
+    @property
+    def encode_args(self) -> tuple[int, bool, int, int, int | None, int, int]:
+        """Return the arguments of encode_command for this command."""
+        return (
+            self.device_code,
+            self.group_mode,
+            self.group_code,
+            self.action,
+            self.dim_level,
+            self.repeats,
+            self.pause,
+        )
+
+    def encode(self) -> tuple[bytes, float]:
+        """Return the send envelope for this command and its air time."""
+        return encode_command(*self.encode_args)
+
+
+class TellstickNetProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol feeding received packets to the TellstickNet hub."""
+
+    def __init__(self, tellstick: TellstickNet) -> None:
+        """Initialize the protocol for a hub."""
+        self._tellstick = tellstick
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        """Handle a datagram from a tellstick."""
+        self._tellstick.handle_datagram(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        """Log socket errors, the endpoint stays open."""
+        LOGGER.warning("TellstickNet socket error: %s", exc)
+
+
+class DuplicateFilter:
+    """Recognizes packets already seen within a time window.
+
+    Keeps the most recent packets in insertion order, so the dict works as a
+    ring buffer where the oldest entry is evicted first.
+    """
+
+    def __init__(self, window: float = DEDUP_WINDOW, size: int = 64) -> None:
+        """Initialize the filter remembering up to size packets."""
+        self.window = window
+        self.suppressed = 0
+        self._size = size
+        self._seen: dict[bytes, float] = {}
+
+    def is_duplicate(self, key: bytes, now: float) -> bool:
+        """Record a packet, return True if a copy was seen within the window.
+
+        Every copy extends the window so a long button press only passes once.
+        """
+        last_seen = self._seen.pop(key, None)
+        self._seen[key] = now
+        if len(self._seen) > self._size:
+            del self._seen[next(iter(self._seen))]
+        if last_seen is not None and now - last_seen < self.window:
+            self.suppressed += 1
+            return True
+        return False
+
+
+# An envelope, its air time, when it was queued and the command it sends.
+Frame = tuple[bytes, float, float, Command | None]
+
+
+class TransmitLane:
+    """Paces frames through one tellstick so their air time never overlaps.
+
+    Frames of interactive commands go before other frames, unless those
+    address the same receivers, and frames of superseded commands are
+    dropped. Frames that queued up while the
+    tellstick was busy are packed into one datagram when packing is enabled.
+    """
+
+    def __init__(self, tellstick: TellstickNet, ip: str) -> None:
+        """Initialize the lane of the tellstick at ip."""
+        self.ip = ip
+        self._tellstick = tellstick
+        self._interactive: deque[Frame] = deque()
+        self._frames: deque[Frame] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.busy_until = 0.0
+        self.last_wait: float | None = None
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of frames waiting for air time."""
+        return len(self._interactive) + len(self._frames)
+
+    def idle_at(self, now: float) -> float:
+        """Return the loop time when every queued frame has left the air."""
+        return (
+            max(self.busy_until, now)
+            + sum(frame[1] for frame in self._interactive)
+            + sum(frame[1] for frame in self._frames)
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Start transmitting queued frames."""
+        self._task = asyncio.create_task(self._async_run())
+
+    @callback
+    def async_cancel(self) -> None:
+        """Stop transmitting without waiting, frames still queued are dropped."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for frames in (self._interactive, self._frames):
+            for frame in frames:
+                self._tellstick.async_frame_done(frame[3])
+            frames.clear()
+
+    async def async_stop(self) -> None:
+        """Stop transmitting, frames still queued are dropped."""
+        if self._task is not None:
+            task = self._task
+            self.async_cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    @callback
+    def async_enqueue(
+        self, buffer: bytes, airtime: float, command: Command | None = None
+    ) -> None:
+        """Queue an envelope that keeps the transmitter busy for airtime seconds."""
+        if command is not None and command.interactive:
+            if self._frames:
+                self._promote(command)
+            frames = self._interactive
+        else:
+            frames = self._frames
+        frames.append((buffer, airtime, asyncio.get_running_loop().time(), command))
+        self._wakeup.set()
+
+    def _promote(self, command: Command) -> None:
+        """Move frames to receivers of an interactive command ahead of it.
+
+        A receiver must get its frames in order, or an older group frame
+        could undo a user's command to one of its lights, or the other way
+        around.
+        """
+        frames: deque[Frame] = deque()
+        for frame in self._frames:
+            if frame[3] is not None and frame[3].overlaps(command):
+                self._interactive.append(frame)
+            else:
+                frames.append(frame)
+        self._frames = frames
+
+    def _next_frames(self) -> deque[Frame] | None:
+        """Return the queue to send from, dropping superseded frames at its head."""
+        for frames in (self._interactive, self._frames):
+            while frames and frames[0][3] is not None and frames[0][3].superseded:
+                self._tellstick.async_frame_done(frames.popleft()[3])
+                self._tellstick.stats.frames_superseded += 1
+            if frames:
+                return frames
+        return None
+
+    async def _async_run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            queue = self._next_frames()
+            if queue is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self.busy_until - loop.time()
+            if delay > 0:
+                # Frames may be queued ahead or superseded while waiting.
+                await asyncio.sleep(delay)
+                continue
+            frames = [queue.popleft()]
+            if self.queue_depth and self._tellstick.pack_frames:
+                size = len(frames[0][0])
+                while (queue := self._next_frames()) is not None:
+                    if size + len(queue[0][0]) > MAX_DATAGRAM_PAYLOAD:
+                        break
+                    frames.append(queue.popleft())
+                    size += len(frames[-1][0])
+            now = loop.time()
+            stats = self._tellstick.stats
+            airtime = 0.0
+            for _buffer, frame_airtime, queued_at, command in frames:
+                self.last_wait = now - queued_at
+                self.max_wait = max(self.max_wait, self.last_wait)
+                stats.lane_wait.observe(self.last_wait * 1000)
+                airtime += frame_airtime
+                self._tellstick.async_frame_done(command)
+            stats.frames_sent += len(frames)
+            stats.airtime += airtime
+            if len(frames) == 1:
+                self._tellstick.async_transmit(self.ip, frames[0][0])
+            else:
+                self._tellstick.async_transmit(
+                    self.ip, b"".join(frame[0] for frame in frames)
+                )
+            self.busy_until = now + airtime
+
+
+class TellstickNet:
+    """Communicates with the tellsticks"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub, async_start opens the UDP endpoint."""
+        self._hass = hass
+        # Config entries and platforms using this hub, see async_get_tellstick.
+        self.references = 0
+        self.unsub_stop: CALLBACK_TYPE | None = None
+        # Callbacks adding the hub's sensors by config entry, the first provides them.
+        self.sensor_providers: dict[str, CALLBACK_TYPE] = {}
+        self.duplicates = DuplicateFilter()
+        self.stats = HubStats()
+        # Pack frames queued for a tellstick into one datagram, see
+        # MAX_DATAGRAM_PAYLOAD and async_add_options.
+        self.pack_frames = False
+        self._transport: asyncio.DatagramTransport | None = None
+        self.tellsticks: dict[str, TellstickInfo] = {}
+        self._discovery_interval = DISCOVERY_MIN_INTERVAL
+        self._discovery_timer: asyncio.TimerHandle | None = None
+        # Discovery requests are broadcast to these addresses, directed
+        # broadcasts of every enabled network adapter when there are several.
+        self.broadcast_addresses = [LIMITED_BROADCAST]
+        # Addresses of configured tellsticks and how many entries configure them.
+        self._static_hosts: dict[str, int] = {}
+        # Hub options of the config entries using the hub, see async_add_options.
+        self._options: list[dict[str, Any]] = []
+        self.last_send_latency: float | None = None
+        # Bursts of commands for the writer, and the number of commands in them.
+        self._queue: asyncio.Queue[list[Command]] = asyncio.Queue()
+        self._queued = 0
+        self._writer: asyncio.Task | None = None
+        self._start_task: asyncio.Task | None = None
+        # Commands waiting for a live tellstick and when they were dispatched.
+        self._held: deque[tuple[float, Command]] = deque(maxlen=MAX_HELD_COMMANDS)
+        # Latest command queued per receiver until it is sent or dropped, see
+        # Command.key. Queueing a newer one supersedes it, so it is dropped
+        # wherever it still waits.
+        self._pending: dict[tuple[int, int, bool], Command] = {}
+        self.lanes: dict[str, TransmitLane] = {}
+        # Remote frame handlers of registered lights by device_code and group_code.
+        self._lights: dict[int, dict[int, list[Callable[[bool], None]]]] = {}
+        # IP of the tellstick that last heard a remote by device_code.
+        self.learned_routes: dict[int, str] = {}
+        # Loop time until which frames heard with a device_code may be echoes
+        # of a command sent to it.
+        self._echo_until: dict[int, float] = {}
+        # Tuned repeats of adaptive lights by (device_code, group_code).
+        self.adaptive_repeats: dict[tuple[int, int], int] = {}
+        self._awaiting_echo: dict[tuple[int, int], tuple[bool, asyncio.TimerHandle]] = {}
+        # Frames heard per (device_code, group_code) while capturing remotes.
+        self._captured: dict[tuple[int, int], int] | None = None
+
+    async def async_start(self) -> None:
+        """Open the UDP endpoint and discover tellsticks."""
+        LOGGER.debug("TellstickNet starting")
+        self.broadcast_addresses = sorted(
+            str(address)
+            for address in await async_get_ipv4_broadcast_addresses(self._hass)
+        )
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setblocking(False)
+        # Replies arrive from every interface, directed broadcasts leave through
+        # the interface on their subnet.
+        try:
+            sock.bind(("0.0.0.0", COMMUNICATION_PORT))
+        except OSError:
+            sock.close()
+            raise
+        self._transport, _protocol = await self._hass.loop.create_datagram_endpoint(
+            lambda: TellstickNetProtocol(self), sock=sock
+        )
+        LOGGER.debug("started listening")
+        self._writer = asyncio.create_task(self._async_writer())
+        now = self._hass.loop.time()
+        for ip in self._static_hosts:
+            self._async_add_static(ip, now)
+        self._async_discovery_tick()
+
+    @callback
+    def async_start_background(self) -> None:
+        """Start without waiting, retrying while the port is taken."""
+        self._start_task = self._hass.async_create_task(self._async_start_retrying())
+
+    async def _async_start_retrying(self) -> None:
+        while True:
+            try:
+                await self.async_start()
+            except OSError as err:
+                LOGGER.error(
+                    "Can not listen for tellsticks on port %d, retrying in %d s: %s",
+                    COMMUNICATION_PORT,
+                    START_RETRY_INTERVAL,
+                    err,
+                )
+                await asyncio.sleep(START_RETRY_INTERVAL)
+            else:
+                return
+
+    async def async_stop(self) -> None:
+        """Stop the writer and close the UDP endpoint."""
+        if self._start_task is not None:
+            self._start_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._start_task
+            self._start_task = None
+        self._held.clear()
+        self._pending.clear()
+        if self._discovery_timer is not None:
+            self._discovery_timer.cancel()
+            self._discovery_timer = None
+        for _on, timer in self._awaiting_echo.values():
+            timer.cancel()
+        self._awaiting_echo.clear()
+        self._echo_until.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer
+            self._writer = None
+        for lane in self.lanes.values():
+            await lane.async_stop()
+        self.lanes.clear()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def handle_datagram(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        """Parse a received packet and fire the matching event."""
+        stats = self.stats
+        stats.packets_received += 1
+        stats.bytes_received += len(data)
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            LOGGER.debug("Received %r from %s", data, addr)
+        ip, _port = addr
+        now = self._hass.loop.time()
+        if data.startswith(TSNETRC):
+            # Only discovered and configured tellsticks are listened to, any
+            # other host could otherwise pose as one.
+            if ip not in self.tellsticks:
+                stats.packets_by_type["ignored"] += 1
+                return
+            self._async_seen(ip, now)
+            if self.duplicates.is_duplicate(data, now):
+                return
+        event = parse_message(data)
+        stats.packets_by_type["unknown" if event is None else event["type"]] += 1
+        if event is None:
+            return
+        if event["type"] == "tellstick_detected":
+            stats.discovery_replies += 1
+            if not self._async_seen(ip, now, event):
+                return
+            if debug:
+                LOGGER.debug(
+                    "Found tellstick: %s %s %s",
+                    event["mac"],
+                    event["activation_code"],
+                    event["version"],
+                )
+        elif event.get("model") == "selflearning" and "device_code" in event:
+            device_code = event["device_code"]
+            # While a command to the code is on the air the frame may be
+            # another tellstick hearing it, which says nothing about the remote.
+            echo_until = self._echo_until.get(device_code)
+            if echo_until is None or now > echo_until:
+                self._echo_until.pop(device_code, None)
+                self.learned_routes[device_code] = ip
+            self._async_handle_remote(event)
+        self._hass.bus.async_fire(EVENT_TELLSTICKNET, event)
+
+    @callback
+    def _async_seen(
+        self, ip: str, now: float, identity: dict[str, Any] | None = None
+    ) -> bool:
+        """Record that a tellstick is alive, returns True if it is new or changed."""
+        if identity is not None:
+            for other in list(self.tellsticks.values()):
+                if other.mac == identity["mac"] and other.ip != ip:
+                    LOGGER.info("Tellstick %s moved to %s", other.mac, ip)
+                    self._async_remove_tellstick(other.ip)
+
+        changed = False
+        became_live = False
+        tellstick = self.tellsticks.get(ip)
+        if tellstick is None:
+            tellstick = self.tellsticks[ip] = TellstickInfo(ip)
+            lane = self.lanes[ip] = TransmitLane(self, ip)
+            lane.async_start()
+            changed = became_live = True
+        elif tellstick.stale:
+            LOGGER.info("Tellstick %s at %s is back", tellstick.mac, ip)
+            tellstick.stale = False
+            became_live = True
+        tellstick.last_seen = now
+
+        if identity is not None and (tellstick.mac, tellstick.version) != (
+            identity["mac"],
+            identity["version"],
+        ):
+            tellstick.mac = identity["mac"]
+            tellstick.activation_code = identity["activation_code"]
+            tellstick.version = identity["version"]
+            changed = True
+        if became_live and self._held:
+            self._async_release_held(now)
+        return changed
+
+    @callback
+    def _async_release_held(self, now: float) -> None:
+        """Dispatch the commands held while no tellstick was live."""
+        held = list(self._held)
+        self._held.clear()
+        commands = []
+        for held_at, command in held:
+            if command.superseded:
+                self.stats.commands_superseded += 1
+                continue
+            if now - held_at > HOLD_COMMANDS_FOR:
+                self.stats.commands_expired += 1
+                self._async_forget_pending(command)
+                continue
+            commands.append(command)
+        if commands:
+            self._async_dispatch(commands)
+
+    @callback
+    def async_add_static_host(self, ip: str) -> CALLBACK_TYPE:
+        """Use a tellstick at a configured address without waiting for discovery.
+
+        Returns a callback removing the address again.
+        """
+        self._static_hosts[ip] = self._static_hosts.get(ip, 0) + 1
+        if self._transport is not None:
+            self._async_add_static(ip, self._hass.loop.time())
+            self._transport.sendto(b"D", (ip, BROADCAST_PORT))
+
+        @callback
+        def remove() -> None:
+            self._static_hosts[ip] -= 1
+            if self._static_hosts[ip]:
+                return
+            del self._static_hosts[ip]
+            if (tellstick := self.tellsticks.get(ip)) is not None:
+                # Left to go stale and expire unless discovery still finds it.
+                tellstick.static = False
+
+        return remove
+
+    @callback
+    def async_add_options(self, options: dict[str, Any]) -> CALLBACK_TYPE:
+        """Apply the hub options of a config entry.
+
+        Entries share the hub, so the smallest dedup window any of them sets
+        is used and frames are packed when any of them enables it. Returns a
+        callback removing the options again.
+        """
+        options = {key: options[key] for key in HUB_OPTIONS if key in options}
+        self._options.append(options)
+        self._async_apply_options()
+
+        @callback
+        def remove() -> None:
+            self._options.remove(options)
+            self._async_apply_options()
+
+        return remove
+
+    @callback
+    def _async_apply_options(self) -> None:
+        """Combine the hub options of every config entry."""
+        self.duplicates.window = min(
+            (
+                options[CONF_DEDUP_WINDOW]
+                for options in self._options
+                if CONF_DEDUP_WINDOW in options
+            ),
+            default=DEDUP_WINDOW,
+        )
+        self.pack_frames = any(
+            options.get(CONF_PACK_FRAMES, False) for options in self._options
+        )
+
+    @callback
+    def _async_add_static(self, ip: str, now: float) -> None:
+        """Mark a configured tellstick live, its identity follows its reply."""
+        self._async_seen(ip, now)
+        self.tellsticks[ip].static = True
+
+    @callback
+    def _async_remove_tellstick(self, ip: str) -> None:
+        """Forget a tellstick and drop the frames queued for it."""
+        self.tellsticks.pop(ip, None)
+        lane = self.lanes.pop(ip, None)
+        if lane is not None:
+            lane.async_cancel()
+
+    @callback
+    def async_rediscover(self) -> None:
+        """Discover tellsticks now and restart the discovery backoff."""
+        if self._transport is None:
+            return
+        if self._discovery_timer is not None:
+            self._discovery_timer.cancel()
+        self._discovery_interval = DISCOVERY_MIN_INTERVAL
+        self._async_discovery_tick()
+
+    @callback
+    def _async_discovery_tick(self) -> None:
+        """Expire silent tellsticks, send a discovery request and schedule the next."""
+        now = self._hass.loop.time()
+        for tellstick in list(self.tellsticks.values()):
+            if tellstick.static:
+                continue
+            silent = now - tellstick.last_seen
+            if silent > EXPIRE_AFTER:
+                LOGGER.info("Forgetting tellstick %s at %s", tellstick.mac, tellstick.ip)
+                self._async_remove_tellstick(tellstick.ip)
+            elif silent > STALE_AFTER and not tellstick.stale:
+                LOGGER.info("Tellstick %s at %s went silent", tellstick.mac, tellstick.ip)
+                tellstick.stale = True
+                self._discovery_interval = DISCOVERY_MIN_INTERVAL
+
+        self.discover()
+        self._discovery_timer = self._hass.loop.call_later(
+            self._discovery_interval, self._async_discovery_tick
+        )
+        self._discovery_interval = min(
+            self._discovery_interval * 2, DISCOVERY_MAX_INTERVAL
+        )
+
+    def discover(self) -> None:
+        """Send discovery requests, tellsticks answer on the listen port.
+
+        One request goes to every broadcast address and configured tellstick
+        at once, so every unit answers within a single round trip.
+        """
+        if self._transport is None:
+            return
+        self.stats.discovery_requests += 1
+        for address in (*self.broadcast_addresses, *self._static_hosts):
+            self._transport.sendto(b"D", (address, BROADCAST_PORT))
+
+    @callback
+    def async_register_light(
+        self,
+        device_code: int,
+        group_code: int,
+        handle_remote: Callable[[bool], None],
+    ) -> CALLBACK_TYPE:
+        """Register a configured light, returns a function that unregisters it.
+
+        handle_remote is called with the new on state when a remote frame for
+        the light is received.
+        """
+        group_codes = self._lights.setdefault(device_code, {})
+        handlers = group_codes.setdefault(group_code, [])
+        handlers.append(handle_remote)
+
+        @callback
+        def unregister() -> None:
+            handlers.remove(handle_remote)
+            if not handlers:
+                del group_codes[group_code]
+            if not group_codes:
+                del self._lights[device_code]
+
+        return unregister
+
+    @callback
+    def _async_handle_remote(self, event: dict[str, Any]) -> None:
+        """Update the lights addressed by a received selflearning frame."""
+        on = event["method"] == "turnon"
+        if not event["group_mode"]:
+            key = (event["device_code"], event["group_code"])
+            self._async_handle_echo(key, on)
+            if self._captured is not None:
+                self._captured[key] = self._captured.get(key, 0) + 1
+        group_codes = self._lights.get(event["device_code"])
+        if group_codes is None:
+            return
+        if event["group_mode"]:
+            for handlers in group_codes.values():
+                for handle_remote in handlers:
+                    handle_remote(on)
+        else:
+            for handle_remote in group_codes.get(event["group_code"], ()):
+                handle_remote(on)
+
+    @property
+    def capturing(self) -> bool:
+        """Return if remote frames are being captured."""
+        return self._captured is not None
+
+    @callback
+    def async_start_capture(self) -> None:
+        """Start collecting the codes of received selflearning remote frames."""
+        self._captured = {}
+
+    @callback
+    def async_stop_capture(self) -> dict[tuple[int, int], int]:
+        """Stop capturing, returns frames heard by (device_code, group_code).
+
+        Codes of registered lights are left out and the most frequently heard
+        codes come first.
+        """
+        captured, self._captured = self._captured or {}, None
+        return {
+            key: frames
+            for key, frames in sorted(captured.items(), key=lambda item: -item[1])
+            if key[1] not in self._lights.get(key[0], {})
+        }
+
+    @callback
+    def async_unused_device_code(self) -> int:
+        """Return a random device code no registered light uses."""
+        while True:
+            device_code = random.randint(1, MAX_DEVICE_CODE)
+            if device_code not in self._lights:
+                return device_code
+
+    @callback
+    def async_pair(
+        self,
+        device_code: int,
+        group_code: int,
+        unpair: bool = False,
+        frames: int = PAIRING_FRAMES,
+        tellstick: str | None = None,
+    ) -> None:
+        """Send a burst of on frames, or off frames to unpair, to a receiver in learn mode."""
+        action = OFF if unpair else ON
+        self.async_queue_commands(
+            [
+                Command(
+                    device_code, group_code, action, tellstick=tellstick, supersede=False
+                )
+                for _ in range(frames)
+            ]
+        )
+
+    @callback
+    def _async_handle_echo(self, key: tuple[int, int], on: bool) -> None:
+        """Count a heard frame as delivery of the command awaiting it."""
+        awaiting = self._awaiting_echo.get(key)
+        if awaiting is None or awaiting[0] != on:
+            return
+        del self._awaiting_echo[key]
+        awaiting[1].cancel()
+        self.async_report_delivery(*key, True)
+
+    @callback
+    def _async_echo_timeout(self, key: tuple[int, int]) -> None:
+        """Count a command no tellstick heard as lost."""
+        del self._awaiting_echo[key]
+        self.async_report_delivery(*key, False)
+
+    @callback
+    def async_report_delivery(
+        self, device_code: int, group_code: int, delivered: bool
+    ) -> None:
+        """Lower repeats of an adaptive light after a delivery, raise them after a loss."""
+        key = (device_code, group_code)
+        repeats = self.adaptive_repeats.get(key)
+        if repeats is None:
+            return
+        if delivered:
+            repeats = max(min(MIN_REPEATS, repeats), repeats - 1)
+        else:
+            repeats = min(MAX_REPEATS, repeats + 2)
+        LOGGER.debug("Repeats for %s set to %d", key, repeats)
+        self.adaptive_repeats[key] = repeats
+
+    @callback
+    def async_queue_command(self, command: Command) -> None:
+        """Queue a command for the writer and return immediately."""
+        self.async_queue_commands([command])
+
+    @callback
+    def async_queue_commands(self, commands: list[Command]) -> None:
+        """Queue commands to send back to back and return immediately.
+
+        The writer sends a burst as soon as it gets to it, collapsing it into
+        group frames where possible without waiting for more commands. Older
+        commands to the same receivers that were not sent yet are superseded.
+        """
+        pending = self._pending
+        for command in commands:
+            command.superseded = False
+            if not command.supersede:
+                continue
+            previous = pending.get(command.key)
+            if previous is not None and previous is not command:
+                previous.superseded = True
+            pending[command.key] = command
+        self.stats.commands_queued += len(commands)
+        self.stats.queue_depth.observe(self.queue_depth)
+        self._queued += len(commands)
+        self._queue.put_nowait(list(commands))
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the state and statistics of the hub in a JSON serializable form."""
+        now = self._hass.loop.time()
+        return {
+            "stats": {
+                **self.stats.as_dict(),
+                "duplicates_suppressed": self.duplicates.suppressed,
+                "queue_depth_now": self.queue_depth,
+            },
+            "tellsticks": [
+                {
+                    "ip": tellstick.ip,
+                    "mac": tellstick.mac,
+                    "activation_code": tellstick.activation_code,
+                    "version": tellstick.version,
+                    "last_seen_ago": round(now - tellstick.last_seen, 1),
+                    "stale": tellstick.stale,
+                    "static": tellstick.static,
+                }
+                for tellstick in self.tellsticks.values()
+            ],
+            "broadcast_addresses": self.broadcast_addresses,
+            "dedup_window": self.duplicates.window,
+            "pack_frames": self.pack_frames,
+            "lanes": {
+                ip: {
+                    "queue_depth": lane.queue_depth,
+                    "last_wait": lane.last_wait,
+                    "max_wait": lane.max_wait,
+                }
+                for ip, lane in self.lanes.items()
+            },
+            "lights": sum(
+                len(handlers)
+                for group_codes in self._lights.values()
+                for handlers in group_codes.values()
+            ),
+            "learned_routes": len(self.learned_routes),
+            "adaptive_repeats": {
+                f"{device_code}::{group_code}": repeats
+                for (device_code, group_code), repeats in self.adaptive_repeats.items()
+            },
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of commands and frames not yet sent."""
+        return self._queued + len(self._held) + sum(
+            lane.queue_depth for lane in self.lanes.values()
+        )
+
+    async def _async_writer(self) -> None:
+        """Encode queued commands and hand them to every tellstick's lane."""
+        while True:
+            commands = await self._queue.get()
+            if len(commands) == 1 and self._can_coalesce(commands[0]):
+                await asyncio.sleep(COALESCE_WINDOW)
+                while not self._queue.empty():
+                    commands.extend(self._queue.get_nowait())
+            self._queued -= len(commands)
+            queued = len(commands)
+            commands = [command for command in commands if not command.superseded]
+            self.stats.commands_superseded += queued - len(commands)
+            if len(commands) > 1:
+                commands = self._coalesce(commands)
+            if commands:
+                self._async_dispatch(commands)
+
+    def _can_coalesce(self, command: Command) -> bool:
+        """Return if other lights could share a group frame with the command."""
+        return (
+            not command.group_mode
+            and command.action in (ON, OFF)
+            and len(self._lights.get(command.device_code, ())) > 1
+        )
+
+    def _coalesce(self, commands: list[Command]) -> list[Command]:
+        """Replace commands to every light of a device_code with one group frame.
+
+        A group frame switches every receiver paired with the device_code, so
+        it is only used when all registered lights with that code get the same
+        on or off command and nothing else is queued for the code.
+        """
+        batches: dict[int, list[Command]] = {}
+        for command in commands:
+            batches.setdefault(command.device_code, []).append(command)
+
+        collapsible = {
+            device_code: batch
+            for device_code, batch in batches.items()
+            if len(batch) > 1
+            and all(self._can_coalesce(member) for member in batch)
+            and len({member.action for member in batch}) == 1
+            and len({(member.tellstick, member.learn_route) for member in batch}) == 1
+            and {member.group_code for member in batch}
+            == self._lights[device_code].keys()
+        }
+        result = []
+        for command in commands:
+            batch = collapsible.get(command.device_code)
+            if batch is None:
+                result.append(command)
+                continue
+            # The members are sent as the group frame, they can not be
+            # superseded anymore.
+            self._async_forget_pending(command)
+            if command is batch[0]:
+                self.stats.commands_coalesced += len(batch)
+                LOGGER.debug(
+                    "Collapsing %d commands to %s into one group frame",
+                    len(batch),
+                    command.device_code,
+                )
+                result.append(
+                    Command(
+                        command.device_code,
+                        0,
+                        command.action,
+                        group_mode=True,
+                        repeats=max(member.repeats for member in batch),
+                        pause=max(member.pause for member in batch),
+                        tellstick=command.tellstick,
+                        learn_route=command.learn_route,
+                        interactive=any(member.interactive for member in batch),
+                    )
+                )
+        return result
+
+    @callback
+    def _async_dispatch(self, commands: list[Command]) -> None:
+        """Encode a burst of commands and queue them on the tellsticks' lanes.
+
+        Commands are held while no tellstick is live, like during startup.
+        A single command comes from the envelope cache, longer bursts like
+        scenes and pairing are encoded in one go.
+        """
+        if not any(not tellstick.stale for tellstick in self.tellsticks.values()):
+            now = self._hass.loop.time()
+            for command in commands:
+                if len(self._held) == self._held.maxlen:
+                    self.stats.commands_expired += 1
+                    self._async_forget_pending(self._held[0][1])
+                self._held.append((now, command))
+            self.stats.commands_held += len(commands)
+            return
+        for command in commands:
+            if command.adaptive and not command.group_mode:
+                key = (command.device_code, command.group_code)
+                command.repeats = self.adaptive_repeats.setdefault(key, command.repeats)
+        if len(commands) == 1:
+            encoded = [commands[0].encode()]
+        else:
+            encoded = encode_commands(command.encode_args for command in commands)
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        for command, (buffer, airtime) in zip(commands, encoded):
+            if debug:
+                LOGGER.debug("light send %s", buffer)
+            lanes = self._async_route(command)
+            command.unsent = len(lanes)
+            if not lanes:
+                self._async_forget_pending(command)
+            for lane in lanes:
+                lane.async_enqueue(buffer, airtime, command)
+            now = self._hass.loop.time()
+            echo_until = (
+                max((lane.idle_at(now) for lane in lanes), default=now + airtime)
+                + ECHO_TIMEOUT
+            )
+            self._echo_until[command.device_code] = echo_until
+            if (
+                command.adaptive
+                and not command.group_mode
+                and command.action in (ON, OFF)
+            ):
+                self._async_await_echo(command, lanes, echo_until)
+
+    @callback
+    def async_frame_done(self, command: Command | None) -> None:
+        """Count a frame of a command as sent or dropped by a lane."""
+        if command is None:
+            return
+        command.unsent -= 1
+        if command.unsent <= 0:
+            self._async_forget_pending(command)
+
+    @callback
+    def _async_forget_pending(self, command: Command) -> None:
+        """Remove a command from the pending table unless a newer one replaced it."""
+        if self._pending.get(command.key) is command:
+            del self._pending[command.key]
+
+    @callback
+    def _async_await_echo(
+        self, command: Command, lanes: list[TransmitLane], echo_until: float
+    ) -> None:
+        """Wait for another tellstick to hear a sent command.
+
+        A tellstick does not hear its own transmissions, so delivery can only
+        be observed when a live tellstick that is not sending the command is
+        within range. Repeats are left alone when every live tellstick sends.
+        """
+        sending = {lane.ip for lane in lanes}
+        if not any(
+            not tellstick.stale and tellstick.ip not in sending
+            for tellstick in self.tellsticks.values()
+        ):
+            return
+        key = (command.device_code, command.group_code)
+        previous = self._awaiting_echo.pop(key, None)
+        if previous is not None:
+            previous[1].cancel()
+        loop = self._hass.loop
+        self._awaiting_echo[key] = (
+            command.action == ON,
+            loop.call_at(echo_until, self._async_echo_timeout, key),
+        )
+
+    @callback
+    def _async_route(self, command: Command) -> list[TransmitLane]:
+        """Return the lanes of the tellsticks that should send a command."""
+        live = [
+            self.lanes[ip]
+            for ip, tellstick in self.tellsticks.items()
+            if not tellstick.stale
+        ]
+        if command.tellstick is not None:
+            mac = normalize_mac(command.tellstick)
+            for lane in live:
+                if normalize_mac(self.tellsticks[lane.ip].mac or "") == mac:
+                    return [lane]
+        if command.learn_route:
+            ip = self.learned_routes.get(command.device_code)
+            for lane in live:
+                if lane.ip == ip:
+                    return [lane]
+        return live
+
+    @callback
+    def async_transmit(self, ip: str, buffer: bytes) -> None:
+        """Send one or more envelopes to a tellstick over the listening socket."""
+        if self._transport is None:
+            LOGGER.warning("TellstickNet is not started, dropping command")
+            return
+        start = time.perf_counter()
+        self._transport.sendto(buffer, (ip, COMMUNICATION_PORT))
+        self.last_send_latency = latency = time.perf_counter() - start
+        stats = self.stats
+        stats.datagrams_sent += 1
+        stats.bytes_sent += len(buffer)
+        stats.send_latency.observe(latency * 1000)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Sent to %s in %.3f ms", ip, latency * 1000)
@@ -0,0 +1 @@
+"""Tests for the Raxa TellstickNet integration."""
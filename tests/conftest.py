@@ -0,0 +1,44 @@
+"""Fixtures for the Raxa TellstickNet tests."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.raxa_tellsticknet.tellsticknet import TellstickNet
+
+from benchmarks.simulator import (
+    SimulatedTellstick,
+    async_start_with_hub,
+    simulated_tellsticks,
+)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture
+async def simulated_hub(
+    hass, socket_enabled, request
+) -> tuple[TellstickNet, list[SimulatedTellstick]]:
+    """Return a started hub and the simulated tellsticks it found.
+
+    One tellstick is simulated unless the test parametrizes the fixture
+    indirectly with a count. Skips when the loopback addresses can not be
+    bound.
+    """
+    tellsticks = simulated_tellsticks(getattr(request, "param", 1))
+    tellstick = TellstickNet(hass)
+    try:
+        try:
+            await asyncio.wait_for(async_start_with_hub(tellstick, tellsticks), 5)
+        except OSError as err:
+            pytest.skip(f"Can not bind simulated tellstick: {err}")
+        yield tellstick, tellsticks
+    finally:
+        await tellstick.async_stop()
+        for simulated in tellsticks:
+            simulated.stop()
@@ -0,0 +1,146 @@
+"""Tests of the config and options flows."""
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.raxa_tellsticknet.config_flow import (
+    merge_lights,
+    parse_lights,
+    remove_devices,
+)
+from custom_components.raxa_tellsticknet.const import (
+    CONF_DEDUP_WINDOW,
+    CONF_PACK_FRAMES,
+    DATA_TELLSTICK,
+    DOMAIN,
+)
+
+LIGHTS = [
+    {"name": "Hall", "device_code": 1234, "group_code": 1, "dimmable": False},
+    {"name": "Porch", "device_code": 1234, "group_code": 2, "dimmable": False},
+]
+
+
+@pytest.fixture
+async def config_entry(hass: HomeAssistant, socket_enabled) -> MockConfigEntry:
+    """Return a set up config entry with two lights."""
+    entry = MockConfigEntry(domain=DOMAIN, data={"lights": LIGHTS})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    yield entry
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def async_options_step(hass: HomeAssistant, entry: MockConfigEntry, step: str):
+    """Open the options flow of an entry at a step of its menu."""
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == FlowResultType.MENU
+    return await hass.config_entries.options.async_configure(
+        result["flow_id"], {"next_step_id": step}
+    )
+
+
+def test_parse_csv_without_header():
+    """Rows without a header follow CSV_COLUMNS, comments and blanks are skipped."""
+    lights = parse_lights("# lights\nHall, 1234, 1, yes\n\nPorch,1234,2\n")
+    assert [
+        (light["name"], light["device_code"], light["group_code"], light["dimmable"])
+        for light in lights
+    ] == [("Hall", 1234, 1, True), ("Porch", 1234, 2, False)]
+
+
+def test_parse_csv_with_header():
+    """A header row names the columns, including other light options."""
+    lights = parse_lights("name,group_code,device_code,repeats\nHall,3,99,4\n")
+    assert lights[0]["device_code"] == 99
+    assert lights[0]["group_code"] == 3
+    assert lights[0]["repeats"] == 4
+
+
+def test_parse_yaml_list_and_mapping():
+    """YAML is a list of lights or a mapping with a lights key."""
+    text = "- name: Hall\n  device_code: 1234\n  group_code: 1\n  dimmable: true\n"
+    mapping = "lights:\n" + "".join(f"  {line}\n" for line in text.splitlines())
+    assert parse_lights(text) == parse_lights(mapping)
+    assert parse_lights(text)[0]["dimmable"] is True
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("", "No lights found"),
+        ("Hall,1234,1,yes,extra", "Row 1 has more than 4 columns"),
+        ("Hall,1234,16", "Light 1"),
+        ("Hall,1234,1\nPorch,x,2", "Light 2"),
+        ("Hall,1234,1,maybe", "Light 1"),
+        ("- just a string", "Light 1 is not a mapping"),
+    ],
+)
+def test_parse_invalid(text, error):
+    """Bad input raises vol.Invalid naming the offending row."""
+    with pytest.raises(vol.Invalid, match=error):
+        parse_lights(text)
+
+
+def test_merge_replaces_lights_with_same_codes():
+    """Imported lights replace configured ones with the same codes."""
+    lights = parse_lights("Hall,1234,1\nPorch,1234,2")
+    merged = merge_lights(lights, parse_lights("Hallway,1234,1\nGarden,55,0"))
+    assert [light["name"] for light in merged] == ["Hallway", "Porch", "Garden"]
+
+
+def test_remove_devices_prunes_groups():
+    """Removed lights leave their groups, groups without members are removed."""
+    lights = parse_lights("Hall,1234,1\nPorch,1234,2\nGarden,55,0")
+    groups = [
+        {"name": "Outside", "members": ["1234::2", "55::0"]},
+        {"name": "Porch only", "members": ["1234::2"]},
+        {"name": "Hall only", "members": ["1234::1"]},
+    ]
+    lights, groups = remove_devices(
+        lights, groups, {"1234::2", "group::Hall only"}
+    )
+    assert [light["name"] for light in lights] == ["Hall", "Garden"]
+    assert groups == [{"name": "Outside", "members": ["55::0"]}]
+
+
+async def test_hub_options(hass: HomeAssistant, config_entry: MockConfigEntry) -> None:
+    """The hub step sets the options of the running hub."""
+    result = await async_options_step(hass, config_entry, "hub")
+    assert result["type"] == FlowResultType.FORM
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {CONF_DEDUP_WINDOW: 1.5, CONF_PACK_FRAMES: True}
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+    assert config_entry.options[CONF_DEDUP_WINDOW] == 1.5
+    assert config_entry.options["lights"] == LIGHTS
+    tellstick = hass.data[DOMAIN][DATA_TELLSTICK]
+    assert tellstick.duplicates.window == 1.5
+    assert tellstick.pack_frames
+
+
+
+async def test_add_group_rejects_taken_name(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> None:
+    """Groups are identified by name, a second group with a name is refused."""
+    group = {"name": "Outside", "members": ["1234::1"], "group_address": False}
+    result = await async_options_step(hass, config_entry, "add_group")
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], group
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+    result = await async_options_step(hass, config_entry, "add_group")
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {**group, "members": ["1234::2"]}
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"name": "group_exists"}
+    assert config_entry.options["groups"] == [group]
@@ -0,0 +1,59 @@
+"""Tests of the lights and light groups against a simulated tellstick."""
+import asyncio
+
+from custom_components.raxa_tellsticknet.light import create_entities
+from custom_components.raxa_tellsticknet.protocol import OFF, ON
+
+
+async def test_group_address(simulated_hub) -> None:
+    """A group_address group sends one group frame and its members follow it."""
+    tellstick, (simulated,) = simulated_hub
+    entities = create_entities(
+        tellstick,
+        {
+            "lights": [
+                {
+                    "name": f"Light {index}",
+                    "device_code": 6000,
+                    "group_code": index,
+                    "dimmable": True,
+                }
+                for index in range(3)
+            ],
+            "groups": [
+                {
+                    "name": "All",
+                    "members": [f"6000::{index}" for index in range(3)],
+                    "group_address": True,
+                }
+            ],
+        },
+    )
+    group = entities["group::All"]
+    # Not added to Home Assistant, there is no state to write.
+    group.async_write_ha_state = lambda: None
+
+    async def switch(on):
+        simulated.received.clear()
+        if on:
+            await group.async_turn_on()
+        else:
+            await group.async_turn_off()
+        while not simulated.received:
+            await asyncio.sleep(0.001)
+        # Give stray member frames a chance to arrive.
+        await asyncio.sleep(0.1)
+
+    await asyncio.wait_for(switch(True), 5)
+    assert [
+        (command.device_code, command.group_mode, command.action)
+        for command in simulated.received
+    ] == [(6000, True, ON)]
+    assert group.is_on and all(member.is_on for member in group.members)
+    await asyncio.wait_for(switch(False), 5)
+    assert [
+        (command.device_code, command.group_mode, command.action)
+        for command in simulated.received
+    ] == [(6000, True, OFF)]
+    assert group.is_on is False
+    assert not any(member.is_on for member in group.members)
@@ -0,0 +1,47 @@
+"""Tests of the diagnostic sensors of the shared hub."""
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.raxa_tellsticknet.const import DOMAIN
+from custom_components.raxa_tellsticknet.sensor import HUB_ID, SENSORS
+
+
+async def test_sensors_once_per_hub(hass: HomeAssistant, socket_enabled) -> None:
+    """Entries share one set of sensors, the next entry takes over on unload."""
+    entries = [
+        MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                "lights": [
+                    {"name": name, "device_code": 1234, "group_code": group_code}
+                ]
+            },
+        )
+        for group_code, name in enumerate(("Hall", "Porch"))
+    ]
+    for entry in entries:
+        entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+
+    def sensors() -> dict[str, str | None]:
+        return {
+            entity.unique_id: entity.config_entry_id
+            for entity in registry.entities.values()
+            if entity.domain == "sensor"
+        }
+
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+    assert sensors() == {
+        f"{HUB_ID}::{description.key}": entries[0].entry_id
+        for description in SENSORS
+    }
+
+    assert await hass.config_entries.async_unload(entries[0].entry_id)
+    await hass.async_block_till_done()
+    assert set(sensors().values()) == {entries[1].entry_id}
+    assert len(sensors()) == len(SENSORS)
+
+    assert await hass.config_entries.async_unload(entries[1].entry_id)
@@ -0,0 +1,229 @@
+"""Tests of the TellstickNet hub against simulated tellsticks."""
+import asyncio
+from collections.abc import Callable
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.raxa_tellsticknet import tellsticknet
+from custom_components.raxa_tellsticknet.const import (
+    CONF_DEDUP_WINDOW,
+    CONF_PACK_FRAMES,
+    EVENT_TELLSTICKNET,
+)
+from custom_components.raxa_tellsticknet.protocol import DIM, OFF, ON
+from custom_components.raxa_tellsticknet.tellsticknet import (
+    DEDUP_WINDOW,
+    Command,
+    DuplicateFilter,
+    TellstickNet,
+)
+
+DISCOVERY = b"TellStickNet:ACCA54012345:ABCDEFGHIJ:17"
+SELFLEARNING = (
+    b"TSNETRCclass:command;protocol:arctech;model:selflearning;data:0x2F4A6B91;\r\n"
+)
+SENSOR = b"TSNETRCclass:sensor;protocol:fineoffset;data:0x48801AEA06;\r\n"
+
+
+async def wait_for(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    """Wait until predicate returns True."""
+
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_duplicate_filter() -> None:
+    """Copies within the window are suppressed and counted."""
+    duplicates = DuplicateFilter(window=0.5)
+    assert not duplicates.is_duplicate(SELFLEARNING, 0.0)
+    assert duplicates.is_duplicate(SELFLEARNING, 0.2)
+    assert duplicates.is_duplicate(SELFLEARNING, 0.6)
+    assert not duplicates.is_duplicate(SELFLEARNING, 1.2)
+    assert not duplicates.is_duplicate(SENSOR, 1.2)
+    assert duplicates.suppressed == 2
+
+
+async def test_options_of_entries(hass: HomeAssistant) -> None:
+    """The smallest dedup window is used, packing is on when any entry enables it."""
+    tellstick = TellstickNet(hass)
+    assert not tellstick.pack_frames
+    remove_long = tellstick.async_add_options(
+        {CONF_DEDUP_WINDOW: 2.0, CONF_PACK_FRAMES: True}
+    )
+    remove_short = tellstick.async_add_options(
+        {CONF_DEDUP_WINDOW: 0.2, CONF_PACK_FRAMES: False}
+    )
+    tellstick.async_add_options({})
+    assert tellstick.duplicates.window == 0.2
+    assert tellstick.pack_frames
+    remove_short()
+    assert tellstick.duplicates.window == 2.0
+    remove_long()
+    assert tellstick.duplicates.window == DEDUP_WINDOW
+    assert not tellstick.pack_frames
+
+
+async def test_only_tellsticks_are_listened_to(hass: HomeAssistant) -> None:
+    """Only a discovery reply makes a host a tellstick, other hosts are ignored."""
+    tellstick = TellstickNet(hass)
+    events = async_capture_events(hass, EVENT_TELLSTICKNET)
+
+    tellstick.handle_datagram(b"junk", ("10.0.0.98", 42314))
+    tellstick.handle_datagram(SELFLEARNING, ("10.0.0.99", 42314))
+    assert not tellstick.tellsticks and not tellstick.lanes
+
+    tellstick.handle_datagram(DISCOVERY, ("10.0.0.2", 42314))
+    tellstick.tellsticks["10.0.0.2"].last_seen = 0.0
+    tellstick.handle_datagram(SELFLEARNING, ("10.0.0.2", 42314))
+    assert list(tellstick.lanes) == ["10.0.0.2"]
+    assert tellstick.tellsticks["10.0.0.2"].last_seen > 0.0
+    await tellstick.async_stop()
+    await hass.async_block_till_done()
+
+    assert [event.data["type"] for event in events] == [
+        "tellstick_detected",
+        "message_received",
+    ]
+    assert tellstick.stats.packets_by_type["ignored"] == 1
+
+
+@pytest.mark.parametrize("simulated_hub", [2], indirect=True)
+async def test_echoes_do_not_move_learned_routes(simulated_hub) -> None:
+    """A tellstick hearing a command another one sends is not the remote's route."""
+    tellstick, (first, second) = simulated_hub
+    second.emit_selflearning(123, 1, False)
+    await wait_for(lambda: 123 in tellstick.learned_routes)
+    assert tellstick.learned_routes == {123: second.host}
+
+    tellstick.async_queue_command(Command(123, 1, ON, learn_route=True))
+    await wait_for(lambda: second.received)
+    # The other tellstick hears the command while it is on the air.
+    first.emit_selflearning(123, 1, True)
+    await wait_for(lambda: tellstick.stats.packets_by_type["message_received"] == 2)
+    assert not first.received
+    assert tellstick.learned_routes == {123: second.host}
+
+
+@pytest.mark.parametrize("simulated_hub", [2], indirect=True)
+async def test_echo_needs_a_listening_tellstick(simulated_hub, monkeypatch) -> None:
+    """Adaptive repeats only change when a tellstick not sending could hear it."""
+    monkeypatch.setattr(tellsticknet, "ECHO_TIMEOUT", 0.01)
+    tellstick, (first, second) = simulated_hub
+
+    # Default routing sends through both tellsticks, neither listens.
+    tellstick.async_queue_command(Command(123, 1, ON, repeats=3, adaptive=True))
+    await wait_for(lambda: first.received and second.received)
+    # Past the air time and the echo timeout.
+    loop = asyncio.get_running_loop()
+    idle_at = max(lane.busy_until for lane in tellstick.lanes.values())
+    await asyncio.sleep(idle_at - loop.time() + 0.05)
+    assert tellstick.adaptive_repeats == {(123, 1): 3}
+
+    # Sending through one leaves the other to hear it, the simulated one
+    # never does, so the command counts as lost.
+    tellstick.async_queue_command(
+        Command(123, 1, OFF, repeats=3, tellstick=first.mac, adaptive=True)
+    )
+    await wait_for(lambda: tellstick.adaptive_repeats[(123, 1)] > 3)
+    assert len(second.received) == 1
+
+
+@pytest.mark.parametrize("group_first", [True, False])
+async def test_interactive_keeps_order_per_receiver(simulated_hub, group_first) -> None:
+    """A user's command does not overtake a group frame to its light, or vice versa."""
+    tellstick, (simulated,) = simulated_hub
+    if group_first:
+        # An automation switches off every receiver of a remote, then a user
+        # switches on one of them.
+        bulk = Command(77, 0, OFF, group_mode=True, repeats=1, pause=0)
+        interactive = Command(77, 1, ON, repeats=1, pause=0, interactive=True)
+    else:
+        bulk = Command(77, 1, ON, repeats=1, pause=0)
+        interactive = Command(
+            77, 0, OFF, group_mode=True, repeats=1, pause=0, interactive=True
+        )
+    other = Command(78, 1, ON, repeats=1, pause=0)
+
+    loop = asyncio.get_running_loop()
+    tellstick.lanes[simulated.host].busy_until = loop.time() + 0.2
+    tellstick.async_queue_commands([other, bulk])
+    tellstick.async_queue_command(interactive)
+    await wait_for(lambda: len(simulated.received) == 3)
+    assert [
+        (command.device_code, command.group_mode, command.group_code, command.action)
+        for command in simulated.received
+    ] == [
+        (77, bulk.group_mode, bulk.group_code, bulk.action),
+        (77, interactive.group_mode, interactive.group_code, interactive.action),
+        (78, False, 1, ON),
+    ]
+
+
+@pytest.mark.parametrize("pack_frames", [False, True])
+async def test_multi_frame_packing(simulated_hub, pack_frames) -> None:
+    """Frames queued while a tellstick is busy share datagrams when enabled."""
+    tellstick, (simulated,) = simulated_hub
+    tellstick.async_add_options({CONF_PACK_FRAMES: pack_frames})
+    commands = [Command(2000 + index, 0, ON, repeats=1, pause=0) for index in range(10)]
+
+    tellstick.async_queue_commands(commands)
+    await wait_for(lambda: len(simulated.received) == len(commands))
+    assert not tellstick._pending
+    assert [command.device_code for command in simulated.received] == [
+        command.device_code for command in commands
+    ]
+    if pack_frames:
+        assert simulated.datagrams < len(commands)
+    else:
+        assert simulated.datagrams == len(commands)
+    assert tellstick.stats.frames_sent == len(commands)
+    assert tellstick.stats.datagrams_sent == simulated.datagrams
+
+
+async def test_slider_drag(simulated_hub) -> None:
+    """Dimming steps queued while a tellstick is busy collapse into the last one."""
+    tellstick, (simulated,) = simulated_hub
+    for dim_level in range(1, 16):
+        tellstick.async_queue_command(Command(3000, 1, DIM, dim_level))
+        await asyncio.sleep(0.01)
+    await wait_for(
+        lambda: simulated.received and simulated.received[-1].dim_level == 15, 10
+    )
+    # Sent and superseded steps are forgotten.
+    assert not tellstick._pending
+    # The first step goes out right away, later ones wait for its air time
+    # and replace each other.
+    assert len(simulated.received) < 5
+    assert tellstick.stats.frames_superseded > 0
+
+
+async def test_interactive_priority(simulated_hub) -> None:
+    """A user's command goes ahead of automation traffic waiting for air time."""
+    tellstick, (simulated,) = simulated_hub
+    bulk = [Command(4000 + index, 0, OFF, repeats=1, pause=0) for index in range(5)]
+    interactive = Command(5000, 0, ON, repeats=1, pause=0, interactive=True)
+
+    # Keep the transmitter busy so every frame has to queue.
+    loop = asyncio.get_running_loop()
+    tellstick.lanes[simulated.host].busy_until = loop.time() + 0.2
+    tellstick.async_queue_commands(bulk)
+    tellstick.async_queue_command(interactive)
+    await wait_for(lambda: len(simulated.received) == len(bulk) + 1)
+    assert simulated.received[0].device_code == interactive.device_code
+
+
+async def test_pairing_burst(simulated_hub) -> None:
+    """Pairing sends a burst of on frames, encoded together."""
+    tellstick, (simulated,) = simulated_hub
+    tellstick.async_pair(777, 2, frames=3)
+    await wait_for(lambda: len(simulated.received) == 3)
+    assert {
+        (command.device_code, command.group_code, command.action)
+        for command in simulated.received
+    } == {(777, 2, ON)}